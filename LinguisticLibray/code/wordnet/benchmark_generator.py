@@ -0,0 +1,81 @@
+"""
+benchmark_generator.py - Words/sec of WordGenerator.generate_multiple
+
+Times generate_multiple(count) twice from the same seed: once with the
+form -> syllables index WordGenerator builds in __init__ ("after") and once
+with the scan over every morpheme entry it replaced ("before"). Both draw the
+same random numbers, so the benchmark also checks that they generate the
+same words. --bulk-count N also times generate_bulk(N), the NumPy batch
+mode that returns plain strings.
+
+Usage: python benchmark_generator.py [--count 10000] [--seed 0] [--skip-before] [--bulk-count 0]
+"""
+
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from word_generator_loader import load_word_generator
+
+word_generator = load_word_generator()
+
+
+class ScanWordGenerator(word_generator.WordGenerator):
+    """WordGenerator finding a form's syllables by scanning every morpheme, as before the index."""
+
+    def get_syllable_count(self, form: str) -> int:
+        for morph in self.morphemes.values():
+            if any(f["form"] == form for f in morph["forms"]):
+                return morph.get("syllables", {}).get("count", 1)
+        return 1
+
+    def get_syllable_info(self, form: str) -> Dict:
+        for morph in self.morphemes.values():
+            if any(f["form"] == form for f in morph["forms"]):
+                return morph.get("syllables",
+                                 {"count": 1, "components": [{"syllable": form, "position": [0, len(form)]}]})
+        return {"count": 1, "components": [{"syllable": form, "position": [0, len(form)]}]}
+
+
+def time_generate(generator: word_generator.WordGenerator, count: int, seed: int) -> Tuple[List[Dict], float]:
+    """Words generated by generate_multiple(count) from the seed and the seconds it took."""
+    random.seed(seed)
+    start_time = time.perf_counter()
+    words = generator.generate_multiple(count)
+    return words, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WordGenerator.generate_multiple")
+    parser.add_argument("--count", type=int, default=10000, help="words to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-before", action="store_true", help="only time the indexed generator")
+    parser.add_argument("--bulk-count", type=int, default=0, help="also time generate_bulk with this many words")
+    args = parser.parse_args()
+
+    generator = word_generator.WordGenerator()
+    words, elapsed = time_generate(generator, args.count, args.seed)
+    print(f"after   {len(words)} words in {elapsed:.3f} s, {len(words) / elapsed:.1f} words/s")
+    if args.bulk_count > 0:
+        generator.get_bulk_sampler()
+        start_time = time.perf_counter()
+        bulk_words = generator.generate_bulk(args.bulk_count, np.random.default_rng(args.seed))
+        bulk_elapsed = time.perf_counter() - start_time
+        print(f"bulk    {len(bulk_words)} words in {bulk_elapsed:.3f} s, {len(bulk_words) / bulk_elapsed:.1f} words/s")
+    if args.skip_before:
+        return
+
+    before_words, before_elapsed = time_generate(ScanWordGenerator(), args.count, args.seed)
+    print(f"before  {len(before_words)} words in {before_elapsed:.3f} s, {len(before_words) / before_elapsed:.1f} words/s")
+    print(f"speedup {before_elapsed / elapsed:.1f}x")
+    if before_words != words:
+        print("MISMATCH: the indexed and scanning generators produced different words")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmark_nbest.py
+
+# Latency of discover_segments_nbest at several k over the example words
+# shipped in morphemes.json.
+# Usage: python benchmark_nbest.py [max_words]
+
+import sys
+import time
+import morphemes_lib as morphemes
+
+k_values = [1, 5, 20]
+
+def get_example_words(max_words):
+	words = []
+	seen = set()
+	for rxk in morphemes.morphemes:
+		for example in morphemes.morphemes[rxk].get("examples", []):
+			if example not in seen:
+				seen.add(example)
+				words.append(example)
+	if max_words > 0:
+		words = words[:max_words]
+	return words
+
+def percentile(sorted_values, pct):
+	ix = int(round((pct / 100) * (len(sorted_values) - 1)))
+	return sorted_values[ix]
+
+def run_benchmark(words, k):
+	latencies = []
+	path_count = 0
+	start_time = time.perf_counter()
+	for word in words:
+		word_start_time = time.perf_counter()
+		path_count += len(morphemes.discover_segments_nbest(word, k))
+		latencies.append(time.perf_counter() - word_start_time)
+	elapsed = time.perf_counter() - start_time
+	latencies.sort()
+	return {
+		"k": k,
+		"words": len(words),
+		"words_per_sec": len(words) / elapsed,
+		"mean_ms": 1000 * elapsed / len(words),
+		"p50_ms": 1000 * percentile(latencies, 50),
+		"p95_ms": 1000 * percentile(latencies, 95),
+		"max_ms": 1000 * latencies[-1],
+		"avg_paths": path_count / len(words)
+	}
+
+def main():
+	max_words = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+	words = get_example_words(max_words)
+	print("segmenting {} example words".format(len(words)))
+	for k in k_values:
+		stats = run_benchmark(words, k)
+		print("k={k:<3} {words_per_sec:9.1f} words/s  mean {mean_ms:.3f} ms  p50 {p50_ms:.3f} ms  p95 {p95_ms:.3f} ms  max {max_ms:.3f} ms  paths/word {avg_paths:.2f}".format(**stats))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,213 @@
+# benchmark_segments.py
+
+# Segments every example word shipped in morphemes.json with discover_segments
+# and reports throughput, latency percentiles, coverage (words whose segments
+# spell the word with no unmatched characters) and how often each WordNet
+# fallback ran. With a baseline file, exits 1 when throughput, p50 or p95
+# latency is more than --tolerance worse than the baseline, or when coverage
+# drops at all.
+# Timed baselines are machine specific: save one with --save-baseline on the
+# machine that runs the comparison. Coverage only depends on the code, the
+# morpheme database and the WordNet corpus, so every full run is also checked
+# against the committed benchmark_segments_coverage.json entry for its engine,
+# when the installed WordNet matches the one the entry was made with (version
+# and lemma count; the committed entries are NLTK's WordNet 3.0 download,
+# 147306 lemmas). Refresh an entry with --save-coverage.
+# --stats PATH adds one instrumented pass, untimed, and writes its per-stage
+# times and counters to PATH, see morphemes_lib.enable_instrumentation.
+# Usage: python benchmark_segments.py [--max-words 0] [--repeat 3] [--engine lattice|greedy] [--stats PATH]
+#                                     [--baseline PATH] [--save-baseline] [--tolerance 0.25]
+#                                     [--save-coverage]
+
+import argparse
+import json
+import os
+import sys
+import time
+import benchmark_nbest
+import morphemes_lib as morphemes
+import morphemes_wn as mdb
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_segments_baseline.json")
+coverage_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_segments_coverage.json")
+
+# metric -> True when bigger is better; checked against the baseline with the tolerance
+timed_metrics = {
+	"words_per_sec": True,
+	"p50_ms": False,
+	"p95_ms": False
+}
+
+def run_pass(words):
+	"one pass over the words: sorted latencies and what the segmentations looked like"
+	latencies = []
+	covered = 0
+	wn_lookups = 0
+	fallback_runs = {fallback_name: 0 for fallback_name, fallback in morphemes.wordnet_fallbacks}
+	fallback_wins = {fallback_name: 0 for fallback_name, fallback in morphemes.wordnet_fallbacks}
+	start_time = time.perf_counter()
+	for word in words:
+		word_start_time = time.perf_counter()
+		results = morphemes.discover_segments(word)
+		latencies.append(time.perf_counter() - word_start_time)
+		# unmatched_char_count alone is 0 for doubled consonants that do not spell the word, eg. alll++aceous
+		word_covered = results["unmatched_char_count"] == 0 and morphemes.format_results(results, "") == word
+		if word_covered:
+			covered += 1
+		wn_lookups += results["wn_lookups"]
+		for fallback_name in results["fallbacks"]:
+			fallback_runs[fallback_name] += 1
+		if len(results["fallbacks"]) > 0 and word_covered:
+			fallback_wins[results["fallbacks"][-1]] += 1
+	elapsed = time.perf_counter() - start_time
+	latencies.sort()
+	return {
+		"words": len(words),
+		"words_per_sec": len(words) / elapsed,
+		"mean_ms": 1000 * elapsed / len(words),
+		"p50_ms": 1000 * benchmark_nbest.percentile(latencies, 50),
+		"p95_ms": 1000 * benchmark_nbest.percentile(latencies, 95),
+		"p99_ms": 1000 * benchmark_nbest.percentile(latencies, 99),
+		"max_ms": 1000 * latencies[-1],
+		"coverage": covered / len(words),
+		"wn_lookups": wn_lookups,
+		"fallback_runs": fallback_runs,
+		"fallback_wins": fallback_wins
+	}
+
+def run_benchmark(words, repeat):
+	"the fastest of repeat passes; everything but the timings is the same in every pass"
+	best_stats = None
+	for ix in range(repeat):
+		stats = run_pass(words)
+		if best_stats is None or stats["words_per_sec"] > best_stats["words_per_sec"]:
+			best_stats = stats
+	best_stats["engine"] = morphemes.segmentation_engine
+	best_stats["wordnet_backend"] = mdb.wordnet_backend
+	best_stats["wordnet_version"] = mdb.load_wordnet().get_version()
+	best_stats["wordnet_lemmas"] = len(mdb.get_lemma_names())
+	best_stats["python"] = sys.version.split()[0]
+	return best_stats
+
+def print_stats(stats):
+	print("{words} words  {words_per_sec:.1f} words/s  mean {mean_ms:.3f} ms  p50 {p50_ms:.3f} ms  p95 {p95_ms:.3f} ms  p99 {p99_ms:.3f} ms  max {max_ms:.3f} ms".format(**stats))
+	print("coverage {:.2%}  WordNet lookups {}".format(stats["coverage"], stats["wn_lookups"]))
+	for fallback_name in stats["fallback_runs"]:
+		print("  fallback {:<18} ran for {:>6} words, completed {:>6}".format(fallback_name, stats["fallback_runs"][fallback_name], stats["fallback_wins"][fallback_name]))
+
+def compare_coverage(stats, baseline):
+	"regression messages, empty unless coverage dropped below the baseline over the same words and WordNet"
+	if baseline["words"] != stats["words"]:
+		print("note: baseline has {} words, this run {}; coverage not compared".format(baseline["words"], stats["words"]))
+		return []
+	for setting in ("wordnet_version", "wordnet_lemmas"):
+		if baseline.get(setting) != stats[setting]:
+			print("note: baseline {} is {}, this run {}; coverage not compared".format(setting, baseline.get(setting), stats[setting]))
+			return []
+	print("{:<14} {:>10.4f}  baseline {:>10.4f}  {}".format("coverage", stats["coverage"], baseline["coverage"], "REGRESSION" if stats["coverage"] < baseline["coverage"] else "ok"))
+	if stats["coverage"] < baseline["coverage"]:
+		return ["coverage {:.4f}, baseline {:.4f}".format(stats["coverage"], baseline["coverage"])]
+	return []
+
+def compare_to_baseline(stats, baseline, tolerance):
+	"regression messages, empty when the timed metrics are as good as the baseline"
+	regressions = []
+	if baseline["words"] != stats["words"]:
+		print("note: baseline has {} words, this run {}".format(baseline["words"], stats["words"]))
+	for setting in ("engine", "wordnet_backend", "wordnet_version", "wordnet_lemmas", "python"):
+		if baseline.get(setting) != stats[setting]:
+			print("note: baseline {} is {}, this run {}".format(setting, baseline.get(setting), stats[setting]))
+	for metric in timed_metrics:
+		if metric not in baseline:
+			continue
+		if timed_metrics[metric]:
+			limit = baseline[metric] * (1 - tolerance)
+			failed = stats[metric] < limit
+		else:
+			limit = baseline[metric] * (1 + tolerance)
+			failed = stats[metric] > limit
+		print("{:<14} {:>10.3f}  baseline {:>10.3f}  {}".format(metric, stats[metric], baseline[metric], "REGRESSION" if failed else "ok"))
+		if failed:
+			regressions.append("{} {:.3f}, limit {:.3f}".format(metric, stats[metric], limit))
+	return regressions
+
+def load_coverage_baselines():
+	"engine -> {words, coverage, wordnet_version, wordnet_lemmas} from the committed coverage baseline"
+	if not os.path.exists(coverage_baseline_path):
+		return {}
+	with open(coverage_baseline_path, "r", encoding="utf-8") as baseline_file:
+		return json.load(baseline_file)
+
+def save_coverage_baseline(stats):
+	coverage_baselines = load_coverage_baselines()
+	coverage_baselines[stats["engine"]] = {setting: stats[setting] for setting in ("words", "coverage", "wordnet_version", "wordnet_lemmas")}
+	with open(coverage_baseline_path, "w", encoding="utf-8") as baseline_file:
+		json.dump(coverage_baselines, baseline_file, indent=2, sort_keys=True)
+		baseline_file.write("\n")
+	print("saved {} coverage to {}".format(stats["engine"], coverage_baseline_path))
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark discover_segments over the example words in morphemes.json")
+	parser.add_argument("--max-words", type=int, default=0, help="0 for every example word")
+	parser.add_argument("--repeat", type=int, default=3, help="passes over the words, the fastest is reported")
+	parser.add_argument("--engine", choices=("lattice", "greedy"), default=morphemes.segmentation_engine, help="segmentation engine to benchmark")
+	parser.add_argument("--baseline", help="baseline JSON file to compare with or save to, an error when given and missing (default: {})".format(os.path.basename(default_baseline_path)))
+	parser.add_argument("--save-baseline", action="store_true", help="write this run as the baseline instead of comparing")
+	parser.add_argument("--save-coverage", action="store_true", help="write this run's coverage to the committed coverage baseline instead of comparing")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction of the baseline")
+	parser.add_argument("--stats", help="write per-stage times and counters from an extra instrumented pass to this JSON file")
+	args = parser.parse_args()
+	if args.baseline is not None and not args.save_baseline and not os.path.exists(args.baseline):
+		parser.error("no baseline at {}, run with --save-baseline to create one".format(args.baseline))
+	baseline_path = args.baseline or default_baseline_path
+	morphemes.segmentation_engine = args.engine
+
+	words = benchmark_nbest.get_example_words(args.max_words)
+	start_time = time.perf_counter()
+	morphemes.get_morpheme_db()
+	mdb.load_wordnet()
+	mdb.get_lemma_names()
+	print("loaded morphemes and WordNet in {:.2f} s".format(time.perf_counter() - start_time))
+
+	stats = run_benchmark(words, max(1, args.repeat))
+	print_stats(stats)
+
+	if args.stats is not None:
+		instrumentation = morphemes.enable_instrumentation()
+		run_pass(words)
+		morphemes.disable_instrumentation()
+		instrumentation.write_json(args.stats)
+		for stage, stage_stats in instrumentation.stats()["stages"].items():
+			print("  stage {:<28} {:>6} words  {:>9.1f} ms  {:>6.1%}".format(stage, stage_stats["words"], stage_stats["total_ms"], stage_stats["share"]))
+		print("wrote stage stats to", args.stats)
+
+	if args.save_coverage:
+		save_coverage_baseline(stats)
+	if args.save_baseline:
+		with open(baseline_path, "w", encoding="utf-8") as baseline_file:
+			json.dump(stats, baseline_file, indent=2, sort_keys=True)
+		print("saved baseline to", baseline_path)
+	if args.save_coverage or args.save_baseline:
+		return
+	regressions = []
+	baseline = None
+	if os.path.exists(baseline_path):
+		with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+			baseline = json.load(baseline_file)
+		regressions += compare_to_baseline(stats, baseline, args.tolerance)
+	else:
+		print("no timed baseline at {}, run with --save-baseline to create one".format(baseline_path))
+	# The committed coverage when there is one for this engine, else the timed baseline's
+	coverage_baseline = load_coverage_baselines().get(stats["engine"])
+	if coverage_baseline is None:
+		print("note: no committed coverage for the {} engine, run with --save-coverage to add it".format(stats["engine"]))
+		coverage_baseline = baseline
+	if coverage_baseline is not None:
+		regressions += compare_coverage(stats, coverage_baseline)
+	if regressions:
+		for regression in regressions:
+			print("REGRESSION:", regression)
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,28 @@
+# build_wordnet_db.py
+
+# Export NLTK's WordNet to the SQLite file morphemes_wn reads when
+# wordnet_backend is "sqlite". Needs nltk and its wordnet corpus, only here.
+# Usage: python build_wordnet_db.py [--output PATH]
+
+import argparse
+import os
+import time
+import morphemes_wn_sqlite as mwns
+
+def main():
+	parser = argparse.ArgumentParser(description="Export NLTK's WordNet to SQLite for morphemes_wn")
+	parser.add_argument("--output", default=mwns.default_db_path, help="database file to write")
+	args = parser.parse_args()
+
+	start_time = time.perf_counter()
+	from nltk.corpus import wordnet
+	output_dir = os.path.dirname(os.path.abspath(args.output))
+	os.makedirs(output_dir, exist_ok=True)
+	counts = mwns.build_wordnet_db(wordnet, args.output)
+	print("wrote WordNet {} to {}".format(wordnet.get_version(), os.path.abspath(args.output)))
+	for table in counts:
+		print("  {:<12} {}".format(table, counts[table]))
+	print("time elapsed {:.1f} s".format(time.perf_counter() - start_time))
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,84 @@
+"""
+morpheme_bulk.py - Vectorized bulk sampling of prefix/root/suffix triples
+
+For runs of millions of words: each slot is an array of MorphemeTable rows.
+A batch of random index triples into the slots is drawn from a
+numpy.random.Generator, MorphemeTable.valid_triples applies the
+is_valid_combination rules to the whole batch as boolean masks over the
+table's boundary columns, and strings are only built for the triples that pass.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from morpheme_table import MorphemeTable, class_ids
+
+
+class BulkSampler:
+    """Batches of valid (prefix, root, suffix) index triples into three arrays of table rows.
+
+    The row arrays are as for TripleSampler: a slot left out of the word is
+    an array holding only EMPTY_ROW.
+    """
+
+    def __init__(self, table: MorphemeTable,
+                 prefix_rows: np.ndarray, root_rows: np.ndarray, suffix_rows: np.ndarray,
+                 min_syllables: int = 1, max_syllables: int = 4):
+        self.table = table
+        self.prefix_rows = prefix_rows
+        self.root_rows = root_rows
+        self.suffix_rows = suffix_rows
+        self.min_syllables = min_syllables
+        self.max_syllables = max_syllables
+
+        # Whether any triple is valid, from one representative of each boundary class
+        representatives = [rows[class_ids(table.boundary_classes(rows, loc))[1]]
+                           for rows, loc in ((prefix_rows, 'prefix'), (root_rows, 'embedded'),
+                                             (suffix_rows, 'suffix'))]
+        grid = np.meshgrid(*representatives, indexing='ij')
+        self.has_valid = bool(table.valid_triples(*grid, min_syllables, max_syllables).any())
+
+    def valid_mask(self, prefix_ixs: np.ndarray, root_ixs: np.ndarray, suffix_ixs: np.ndarray) -> np.ndarray:
+        """is_valid_combination for every index triple of the arrays."""
+        return self.table.valid_triples(self.prefix_rows[prefix_ixs], self.root_rows[root_ixs],
+                                        self.suffix_rows[suffix_ixs], self.min_syllables, self.max_syllables)
+
+    def sample_indices(self, count: int, rng: Optional[np.random.Generator] = None,
+                       batch_size: int = 1 << 18) -> np.ndarray:
+        """count valid index triples as a (count, 3) array, ValueError when there are none.
+
+        Batches are uniform draws with the invalid triples masked out, so the
+        survivors are uniform over the valid triples.
+        """
+        if not self.has_valid:
+            raise ValueError("No valid morpheme combination exists")
+        if rng is None:
+            rng = np.random.default_rng()
+        batches = []
+        found = 0
+        drawn = 0
+        while found < count:
+            # Size the batch by the acceptance rate seen so far
+            wanted = count - found
+            if found > 0:
+                wanted = int(wanted * drawn / found * 1.1) + 16
+            size = min(max(wanted, 1024), batch_size)
+            prefix_ixs = rng.integers(0, len(self.prefix_rows), size)
+            root_ixs = rng.integers(0, len(self.root_rows), size)
+            suffix_ixs = rng.integers(0, len(self.suffix_rows), size)
+            valid = self.valid_mask(prefix_ixs, root_ixs, suffix_ixs)
+            batch = np.stack([prefix_ixs[valid], root_ixs[valid], suffix_ixs[valid]], axis=1)
+            drawn += size
+            batches.append(batch[:count - found])
+            found += len(batches[-1])
+        if not batches:
+            return np.empty((0, 3), dtype=np.int64)
+        return np.concatenate(batches)
+
+    def words(self, ixs: np.ndarray) -> List[str]:
+        """Word strings of (prefix, root, suffix) index triples."""
+        forms = self.table.forms
+        words = np.char.add(np.char.add(forms[self.prefix_rows[ixs[:, 0]]], forms[self.root_rows[ixs[:, 1]]]),
+                            forms[self.suffix_rows[ixs[:, 2]]])
+        return words.tolist()
@@ -0,0 +1,69 @@
+"""
+morpheme_sampler.py - Direct sampling of valid prefix/root/suffix triples
+
+WordGenerator.is_valid_combination only reads a few features of each form:
+its syllable count, whether it has a vowel and whether consonants sit at its
+edges. MorphemeTable keeps those as columns. Forms with the same features are
+interchangeable for the check, so the sampler groups each slot's forms into
+boundary classes, works out once which class triples pass and how many form
+triples each covers, then draws a class triple weighted by that count and a
+form uniformly inside each class. Every draw is valid, and valid triples come
+out uniformly, just as they would from rejection sampling.
+"""
+
+import bisect
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from morpheme_table import MorphemeTable, class_ids
+
+
+def group_by_class(table: MorphemeTable, rows: np.ndarray, loc: str,
+                   morphemes: List[Dict]) -> Tuple[List[List[Dict]], np.ndarray]:
+    """Morphemes of each boundary class, classes and members in first-seen order,
+    and one row of the table representing each class."""
+    ids, first_ixs = class_ids(table.boundary_classes(rows, loc))
+    classes = [[] for _ in first_ixs]
+    for class_id, morpheme in zip(ids.tolist(), morphemes):
+        classes[class_id].append(morpheme)
+    return classes, rows[first_ixs]
+
+
+class TripleSampler:
+    """Uniform draws from the valid (prefix, root, suffix) triples of three morpheme lists.
+
+    Each list holds dicts with a "form", and goes with an array of the table
+    rows of those forms; a slot left out of the word is a list holding one
+    morpheme with an empty form, at row EMPTY_ROW.
+    """
+
+    def __init__(self, table: MorphemeTable,
+                 prefix_rows: np.ndarray, root_rows: np.ndarray, suffix_rows: np.ndarray,
+                 prefixes: List[Dict], roots: List[Dict], suffixes: List[Dict],
+                 min_syllables: int = 1, max_syllables: int = 4):
+        self.prefix_classes, prefix_reps = group_by_class(table, prefix_rows, 'prefix', prefixes)
+        self.root_classes, root_reps = group_by_class(table, root_rows, 'embedded', roots)
+        self.suffix_classes, suffix_reps = group_by_class(table, suffix_rows, 'suffix', suffixes)
+
+        # Valid class triples, prefix class outermost, and the running count of form triples they cover
+        grid = np.meshgrid(prefix_reps, root_reps, suffix_reps, indexing='ij')
+        valid = table.valid_triples(*grid, min_syllables, max_syllables).ravel()
+        prefix_sizes, root_sizes, suffix_sizes = [np.array([len(members) for members in classes], dtype=np.int64)
+                                                  for classes in (self.prefix_classes, self.root_classes,
+                                                                  self.suffix_classes)]
+        sizes = (prefix_sizes[:, None, None] * root_sizes[None, :, None] * suffix_sizes[None, None, :]).ravel()
+        shape = (len(self.prefix_classes), len(self.root_classes), len(self.suffix_classes))
+        self.class_triples = [(self.prefix_classes[p], self.root_classes[r], self.suffix_classes[s])
+                              for p, r, s in zip(*np.unravel_index(np.flatnonzero(valid), shape))]
+        self.cum_counts = np.cumsum(sizes[valid]).tolist()
+        self.total = self.cum_counts[-1] if self.cum_counts else 0
+
+    def sample(self, rng=random) -> Tuple[Dict, Dict, Dict]:
+        """One valid (prefix, root, suffix), ValueError when there is none."""
+        if self.total == 0:
+            raise ValueError("No valid morpheme combination exists")
+        triple_ix = bisect.bisect_right(self.cum_counts, rng.randrange(self.total))
+        prefix_list, root_list, suffix_list = self.class_triples[triple_ix]
+        return rng.choice(prefix_list), rng.choice(root_list), rng.choice(suffix_list)
@@ -0,0 +1,186 @@
+"""
+morpheme_table.py - Columnar NumPy view of the morpheme forms
+
+One row per form, in database order (group by group, forms in their listed
+order), so the rows a mask selects come out in the order a linear scan over
+the morphemes dict would visit them. Loc, length and syllable filters are
+boolean masks over the columns instead of Python loops.
+
+The table also holds the boundary features WordGenerator.is_valid_combination
+reads, worked out once for every form from its characters, and checks whole
+arrays of (prefix, root, suffix) rows against those rules at once. The word
+generators, TripleSampler and BulkSampler all read these columns.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LOC_PREFIX = 0
+LOC_ROOT = 1
+LOC_SUFFIX = 2
+LOC_OTHER = -1
+
+LOC_CODES = {
+    'prefix': LOC_PREFIX,
+    'embedded': LOC_ROOT,
+    'suffix': LOC_SUFFIX
+}
+
+# Row of the empty form, standing in for a slot left out of a word; it is the
+# table's last row, and no mask selects it
+EMPTY_ROW = -1
+
+VOWELS = list('aeiou')
+
+
+class MorphemeTable:
+    """Forms of a morphemes dict as parallel NumPy columns.
+
+    forms              form strings
+    lengths            form lengths
+    locs               LOC_PREFIX, LOC_ROOT, LOC_SUFFIX or LOC_OTHER
+    syllables          syllable count of the form's group, 1 when not recorded
+    form_syllables     syllables of the first group listing the form, which is
+                       what WordGenerator counts for the form
+    group_ids          index of the form's group in group_keys
+    form_ixs           position of the form in its group's forms list
+    has_vowel          the form has one of a, e, i, o, u
+    initial_consonant  the form starts with a consonant
+    initial_cluster    the form starts with two consonants
+    final_consonant    the form ends with a consonant
+    final_cluster      the form ends with two consonants
+
+    Every column has one more entry than the table has forms, for EMPTY_ROW.
+    """
+
+    def __init__(self, group_keys: List[str], forms: List[str], locs: List[int],
+                 syllables: List[int], group_ids: List[int], form_ixs: List[int]):
+        self.group_keys = group_keys
+        self.forms = np.array(forms + [''], dtype=str)
+        self.lengths = np.array([len(form) for form in forms] + [0], dtype=np.int32)
+        self.locs = np.array(locs + [LOC_OTHER], dtype=np.int8)
+        self.syllables = np.array(syllables + [0], dtype=np.int32)
+        self.group_ids = np.array(group_ids + [-1], dtype=np.int32)
+        self.form_ixs = np.array(form_ixs + [-1], dtype=np.int32)
+
+        # First row of every distinct form, for form_syllables and row_of_form
+        distinct_forms, first_rows, form_numbers = np.unique(self.forms[:EMPTY_ROW], return_index=True,
+                                                             return_inverse=True)
+        self.first_row_by_form = dict(zip(distinct_forms.tolist(), first_rows.tolist()))
+        self.form_syllables = np.append(self.syllables[first_rows][form_numbers], 0).astype(np.int32)
+
+        # Characters of every form as a (rows, longest form) matrix, padded with ''
+        chars = np.char.lower(self.forms.astype(f"U{max(2, self.lengths.max())}"))
+        chars = chars.view('U1').reshape(len(self.forms), -1)
+        consonants = np.char.isalpha(chars) & ~np.isin(chars, VOWELS)
+        rows = np.arange(len(self.forms))
+        self.has_vowel = np.isin(chars, VOWELS).any(axis=1)
+        self.initial_consonant = consonants[:, 0]
+        self.initial_cluster = (self.lengths > 1) & consonants[:, 0] & consonants[:, 1]
+        self.final_consonant = (self.lengths > 0) & consonants[rows, np.maximum(self.lengths - 1, 0)]
+        self.final_cluster = ((self.lengths > 1) & self.final_consonant
+                              & consonants[rows, np.maximum(self.lengths - 2, 0)])
+
+    @classmethod
+    def from_morphemes(cls, morphemes: Dict) -> 'MorphemeTable':
+        """Build the table from a morphemes.json style dict, skipping groups without forms."""
+        group_keys = []
+        forms = []
+        locs = []
+        syllables = []
+        group_ids = []
+        form_ixs = []
+        for key, value in morphemes.items():
+            if not isinstance(value, dict) or not value.get('forms'):
+                continue
+            group_id = len(group_keys)
+            group_keys.append(key)
+            syllable_count = value.get('syllables', {}).get('count', 1)
+            for form_ix, form in enumerate(value['forms']):
+                forms.append(form.get('form', ''))
+                locs.append(LOC_CODES.get(form.get('loc', ''), LOC_OTHER))
+                syllables.append(syllable_count)
+                group_ids.append(group_id)
+                form_ixs.append(form_ix)
+        return cls(group_keys, forms, locs, syllables, group_ids, form_ixs)
+
+    @classmethod
+    def from_forms(cls, forms: Sequence[str], syllables: Sequence[int]) -> 'MorphemeTable':
+        """Table of bare forms with the given syllable counts, one group per form."""
+        return cls([str(ix) for ix in range(len(forms))], list(forms), [LOC_OTHER] * len(forms),
+                   list(syllables), list(range(len(forms))), [0] * len(forms))
+
+    def __len__(self) -> int:
+        return len(self.forms) - 1
+
+    def mask(self, loc: Optional[str] = None,
+             min_length: Optional[int] = None, max_length: Optional[int] = None,
+             min_syllables: Optional[int] = None, max_syllables: Optional[int] = None,
+             first_form_only: bool = False) -> np.ndarray:
+        """Boolean mask of the rows matching every given condition, syllables as the group's."""
+        selected = self.group_ids >= 0
+        if loc is not None:
+            selected &= self.locs == LOC_CODES.get(loc, LOC_OTHER)
+        if min_length is not None:
+            selected &= self.lengths >= min_length
+        if max_length is not None:
+            selected &= self.lengths <= max_length
+        if min_syllables is not None:
+            selected &= self.syllables >= min_syllables
+        if max_syllables is not None:
+            selected &= self.syllables <= max_syllables
+        if first_form_only:
+            selected &= self.form_ixs == 0
+        return selected
+
+    def rows(self, mask: np.ndarray) -> np.ndarray:
+        """Row numbers selected by a mask, in database order."""
+        return np.flatnonzero(mask)
+
+    def group_key(self, row: int) -> str:
+        return self.group_keys[self.group_ids[row]]
+
+    def row_of_form(self, form: str) -> Optional[int]:
+        """First row with the form, EMPTY_ROW for '', None when the table does not have it."""
+        if form == '':
+            return EMPTY_ROW
+        return self.first_row_by_form.get(form)
+
+    def boundary_classes(self, rows: np.ndarray, loc: str) -> np.ndarray:
+        """The features valid_triples reads of each row in the loc's slot, one row of ints per row.
+
+        prefix: syllables, has vowel, ends with a consonant
+        root: syllables, has vowel, starts with two consonants, ends with two consonants
+        suffix: syllables, has vowel, starts with a consonant
+        Rows with equal features are interchangeable for valid_triples.
+        """
+        if loc == 'prefix':
+            columns = (self.form_syllables, self.has_vowel, self.final_consonant)
+        elif loc == 'suffix':
+            columns = (self.form_syllables, self.has_vowel, self.initial_consonant)
+        else:
+            columns = (self.form_syllables, self.has_vowel, self.initial_cluster, self.final_cluster)
+        return np.stack([column[rows] for column in columns], axis=1).astype(np.int32)
+
+    def valid_triples(self, prefix_rows: np.ndarray, root_rows: np.ndarray, suffix_rows: np.ndarray,
+                      min_syllables: int = 1, max_syllables: int = 4) -> np.ndarray:
+        """WordGenerator.is_valid_combination for every (prefix, root, suffix) of the row arrays."""
+        total_syllables = (self.form_syllables[prefix_rows] + self.form_syllables[root_rows]
+                           + self.form_syllables[suffix_rows])
+        valid = self.has_vowel[prefix_rows] | self.has_vowel[root_rows] | self.has_vowel[suffix_rows]
+        valid &= (total_syllables >= min_syllables) & (total_syllables <= max_syllables)
+        # No triple consonants at morpheme boundaries; the empty form has no consonant edges
+        valid &= ~(self.final_consonant[prefix_rows] & self.initial_cluster[root_rows])
+        valid &= ~(self.final_cluster[root_rows] & self.initial_consonant[suffix_rows])
+        return valid
+
+
+def class_ids(classes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Class number of each row of a boundary_classes array, numbering the classes in
+    first-seen order, and the index of each class's first row."""
+    distinct, first_ixs, inverse = np.unique(classes, axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first_ixs, kind='stable')
+    renumber = np.empty(len(order), dtype=np.int64)
+    renumber[order] = np.arange(len(order))
+    return renumber[inverse.ravel()], first_ixs[order]
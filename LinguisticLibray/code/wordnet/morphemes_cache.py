@@ -0,0 +1,60 @@
+# morphemes_cache.py
+
+from collections import OrderedDict
+import threading
+
+# returned by get() on a miss, since None can be a cached value
+MISSING = object()
+
+class LRUCache:
+	"size-bounded least recently used cache with hit, miss and eviction counters"
+
+	def __init__(self, maxsize):
+		if maxsize < 1:
+			raise ValueError("maxsize must be at least 1")
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key, default=MISSING):
+		with self.lock:
+			if key in self.entries:
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return self.entries[key]
+			self.misses += 1
+			return default
+
+	def put(self, key, value):
+		with self.lock:
+			self.entries[key] = value
+			self.entries.move_to_end(key)
+			if len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self):
+		"drop every entry and reset the counters"
+		with self.lock:
+			self.entries.clear()
+			self.hits = 0
+			self.misses = 0
+			self.evictions = 0
+
+	def stats(self):
+		with self.lock:
+			lookups = self.hits + self.misses
+			return {
+				"size": len(self.entries),
+				"maxsize": self.maxsize,
+				"hits": self.hits,
+				"misses": self.misses,
+				"evictions": self.evictions,
+				"hit_rate": self.hits / lookups if lookups > 0 else 0.0
+			}
+
+	def __len__(self):
+		return len(self.entries)
@@ -0,0 +1,131 @@
+# morphemes_examples.py
+
+# Index over an example lexicon for find_examples_for_morpheme. Words get ids
+# in lexicon order. The prefix trie and the reversed suffix trie list, at each
+# node, every word passing through it; the n-gram index lists, for every
+# substring of up to gram_size characters inside a word (first and last
+# letter excluded, as embedded roots are), the words containing it. Every id
+# list is ascending, so a query reads matches in lexicon order and stops after
+# the first N, without scanning the rest of the lexicon.
+
+import morphemes_index as mx
+
+gram_size = 3
+
+def bump_version(method):
+	def changed(self, *args):
+		self.version += 1
+		return method(self, *args)
+	return changed
+
+class ExampleList(list):
+	"list counting its changes in version, so an index over it can tell it is stale without comparing words"
+	# at class level too, unpickling extends the list before restoring its attributes
+	version = 0
+
+	append = bump_version(list.append)
+	extend = bump_version(list.extend)
+	insert = bump_version(list.insert)
+	remove = bump_version(list.remove)
+	pop = bump_version(list.pop)
+	clear = bump_version(list.clear)
+	sort = bump_version(list.sort)
+	reverse = bump_version(list.reverse)
+	__setitem__ = bump_version(list.__setitem__)
+	__delitem__ = bump_version(list.__delitem__)
+	__iadd__ = bump_version(list.__iadd__)
+	__imul__ = bump_version(list.__imul__)
+
+def add_to_trie(trie, word_id, chars):
+	node = trie
+	node["ids"].append(word_id)
+	for ch in chars:
+		if ch not in node["next"]:
+			node["next"][ch] = mx.new_trie_node()
+		node = node["next"][ch]
+		node["ids"].append(word_id)
+
+def interior_grams(word):
+	"every distinct substring of 1 to gram_size characters of the word without its first and last letter"
+	interior = word[1:len(word)-1]
+	grams = set()
+	for ix in range(len(interior)):
+		for n in range(1, gram_size + 1):
+			if ix + n <= len(interior):
+				grams.add(interior[ix:ix+n])
+	return grams
+
+def build_example_index(words):
+	"tries and n-gram postings over the words, duplicates dropped"
+	words = list(dict.fromkeys(words))
+	prefix_trie = mx.new_trie_node()
+	suffix_trie = mx.new_trie_node()
+	grams = {}
+	for word_id, word in enumerate(words):
+		add_to_trie(prefix_trie, word_id, word)
+		add_to_trie(suffix_trie, word_id, reversed(word))
+		for gram in interior_grams(word):
+			if gram not in grams:
+				grams[gram] = []
+			grams[gram].append(word_id)
+	return {
+		"words": words,
+		"prefix_trie": prefix_trie,
+		"suffix_trie": suffix_trie,
+		"grams": grams
+	}
+
+def find_trie_node(trie, chars):
+	node = trie
+	for ch in chars:
+		node = node["next"].get(ch)
+		if node is None:
+			return None
+	return node
+
+def take_longer_words(words, word_ids, morpheme, limit):
+	"the first limit words of word_ids longer than the morpheme"
+	ret_words = []
+	for word_id in word_ids:
+		if len(ret_words) >= limit:
+			break
+		if len(words[word_id]) > len(morpheme):
+			ret_words.append(words[word_id])
+	return ret_words
+
+def match_prefix_examples(example_index, morpheme, limit):
+	"words starting with the morpheme and longer than it, lexicon order"
+	node = find_trie_node(example_index["prefix_trie"], morpheme)
+	if node is None:
+		return []
+	return take_longer_words(example_index["words"], node["ids"], morpheme, limit)
+
+def match_suffix_examples(example_index, morpheme, limit):
+	"words ending with the morpheme and longer than it, lexicon order"
+	node = find_trie_node(example_index["suffix_trie"], reversed(morpheme))
+	if node is None:
+		return []
+	return take_longer_words(example_index["words"], node["ids"], morpheme, limit)
+
+def match_root_examples(example_index, morpheme, limit):
+	"words containing the morpheme away from their first and last letter, lexicon order"
+	words = example_index["words"]
+	if len(morpheme) == 0:
+		return take_longer_words(words, range(len(words)), morpheme, limit)
+	n = min(gram_size, len(morpheme))
+	# every gram of the morpheme must be in the word, so walk the rarest one's postings
+	candidates = None
+	for ix in range(len(morpheme) - n + 1):
+		postings = example_index["grams"].get(morpheme[ix:ix+n])
+		if postings is None:
+			return []
+		if candidates is None or len(postings) < len(candidates):
+			candidates = postings
+	ret_words = []
+	for word_id in candidates:
+		if len(ret_words) >= limit:
+			break
+		word = words[word_id]
+		if len(word) > len(morpheme) and morpheme in word[1:len(word)-1]:
+			ret_words.append(word)
+	return ret_words
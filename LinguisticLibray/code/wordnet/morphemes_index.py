@@ -0,0 +1,118 @@
+# morphemes_index.py
+
+# Lookup indexes over the morpheme database, built once at load time.
+# Every form is identified by its position in the form table, which follows
+# the order of the database (group order, then form order), so sorting ids
+# reproduces the order a linear scan over the database would visit them in.
+
+def build_form_table(morphemes):
+	"flat list of (group key, form object), form id is the list position"
+	form_table = []
+	for rxk in morphemes:
+		for form_obj in morphemes[rxk]["forms"]:
+			form_table.append((rxk, form_obj))
+	return form_table
+
+def new_trie_node():
+	return {"next": {}, "ids": []}
+
+def build_prefix_trie(form_table):
+	"character trie over all prefix forms"
+	trie = new_trie_node()
+	for form_id, (rxk, form_obj) in enumerate(form_table):
+		if form_obj["loc"] == "prefix":
+			node = trie
+			for ch in form_obj["form"]:
+				if ch not in node["next"]:
+					node["next"][ch] = new_trie_node()
+				node = node["next"][ch]
+			node["ids"].append(form_id)
+	return trie
+
+def match_prefix_ids(prefix_trie, word, start=0):
+	"ids of the prefix forms word[start:] starts with, shortest form first"
+	ids = list(prefix_trie["ids"])
+	node = prefix_trie
+	for ix in range(start, len(word)):
+		node = node["next"].get(word[ix])
+		if node is None:
+			break
+		ids.extend(node["ids"])
+	return ids
+
+def build_suffix_trie(form_table):
+	"character trie over all suffix forms, read right to left"
+	trie = new_trie_node()
+	for form_id, (rxk, form_obj) in enumerate(form_table):
+		if form_obj["loc"] == "suffix":
+			node = trie
+			for ch in reversed(form_obj["form"]):
+				if ch not in node["next"]:
+					node["next"][ch] = new_trie_node()
+				node = node["next"][ch]
+			node["ids"].append(form_id)
+	return trie
+
+def match_suffix_ids(suffix_trie, word, end=None):
+	"ids of the suffix forms word[:end] ends with, shortest form first"
+	if end is None:
+		end = len(word)
+	ids = list(suffix_trie["ids"])
+	node = suffix_trie
+	for ix in range(end - 1, -1, -1):
+		node = node["next"].get(word[ix])
+		if node is None:
+			break
+		ids.extend(node["ids"])
+	return ids
+
+def build_root_automaton(form_table):
+	"Aho-Corasick automaton over all embedded (root) forms"
+	goto = [{}]
+	fail = [0]
+	out = [[]]
+	form_lens = {}
+	for form_id, (rxk, form_obj) in enumerate(form_table):
+		if form_obj["loc"] == "embedded":
+			state = 0
+			for ch in form_obj["form"]:
+				if ch not in goto[state]:
+					goto.append({})
+					fail.append(0)
+					out.append([])
+					goto[state][ch] = len(goto) - 1
+				state = goto[state][ch]
+			out[state].append(form_id)
+			form_lens[form_id] = len(form_obj["form"])
+
+	# breadth first, so the fail link of a shallower state is always ready
+	queue = list(goto[0].values())
+	qx = 0
+	while qx < len(queue):
+		state = queue[qx]
+		qx += 1
+		for ch, child in goto[state].items():
+			queue.append(child)
+			if state > 0:
+				fx = fail[state]
+				while fx > 0 and ch not in goto[fx]:
+					fx = fail[fx]
+				fail[child] = goto[fx].get(ch, 0)
+			out[child] = out[child] + out[fail[child]]
+	return {"goto": goto, "fail": fail, "out": out, "form_lens": form_lens}
+
+def match_root_occurrences(root_automaton, word):
+	"(start offset, form id) of every root form occurrence, in order of end offset"
+	goto = root_automaton["goto"]
+	fail = root_automaton["fail"]
+	out = root_automaton["out"]
+	form_lens = root_automaton["form_lens"]
+	occurrences = []
+	state = 0
+	for ix, ch in enumerate(word):
+		while state > 0 and ch not in goto[state]:
+			state = fail[state]
+		state = goto[state].get(ch, 0)
+		for form_id in out[state]:
+			occurrences.append((ix + 1 - form_lens[form_id], form_id))
+	return occurrences
@@ -0,0 +1,295 @@
+# morphemes_lattice.py
+
+# Single pass segmentation: every prefix, root and suffix match in the word
+# is collected into one lattice of spans, then dynamic programming picks the
+# path that covers the most characters (ties broken by preferring longer
+# morphemes), instead of re-running the greedy pipeline with up to four
+# strategy orders.
+
+import morphemes_lib as morphemes
+import morphemes_index as mx
+
+debug = 0
+
+# position in the prefix, root, suffix order reached by a partial path
+STAGE_START = 0
+STAGE_PREFIX = 1
+STAGE_ROOT = 2
+STAGE_SUFFIX = 3
+STAGE_DOUBLED = 4 # prefix or root took a doubled consonant, a vowel suffix must follow
+
+# an edge is (start, end, loc, form id, doubled)
+EDGE_START = 0
+EDGE_END = 1
+EDGE_LOC = 2
+EDGE_FORM_ID = 3
+EDGE_DOUBLED = 4
+
+def build_lattice(word):
+	"every morpheme match span over the word, edges grouped by start offset"
+	db = morphemes.get_morpheme_db()
+	form_table = db["form_table"]
+	word_len = len(word)
+	edges = [[] for ix in range(word_len + 1)]
+	prefix_ids = {}
+	suffix_ids = {}
+	root_indexes = {}
+
+	for ix in range(word_len):
+		prefix_ids[ix] = mx.match_prefix_ids(db["prefix_trie"], word, ix)
+		for form_id in prefix_ids[ix]:
+			form_len = len(form_table[form_id][1]["form"])
+			edges[ix].append((ix, ix + form_len, "prefix", form_id, False))
+
+	for start, form_id in mx.match_root_occurrences(db["root_automaton"], word):
+		if form_id not in root_indexes:
+			root_indexes[form_id] = start
+		form_len = len(form_table[form_id][1]["form"])
+		edges[start].append((start, start + form_len, "root", form_id, False))
+
+	for end in range(1, word_len + 1):
+		suffix_ids[end] = mx.match_suffix_ids(db["suffix_trie"], word, end)
+		for form_id in suffix_ids[end]:
+			form_len = len(form_table[form_id][1]["form"])
+			edges[end - form_len].append((end - form_len, end, "suffix", form_id, False))
+
+	# consonant doubling, eg. hop + p + ing: the prefix or root absorbs the doubled letter
+	for ix in range(word_len):
+		for edge in list(edges[ix]):
+			end = edge[EDGE_END]
+			if edge[EDGE_LOC] != "suffix" and 0 < end < word_len - 1:
+				if word[end] == word[end - 1] and word[end] in morphemes.consonants:
+					edges[ix].append((ix, end + 1, edge[EDGE_LOC], edge[EDGE_FORM_ID], True))
+
+	return {
+		"word": word,
+		"edges": edges,
+		"prefix_ids": prefix_ids,
+		"suffix_ids": suffix_ids,
+		"root_indexes": root_indexes
+	}
+
+def next_stage(stage, edge, word):
+	"stage reached by taking edge from stage, None if the edge is not allowed there"
+	loc = edge[EDGE_LOC]
+	if loc == "prefix":
+		if stage == STAGE_START and edge[EDGE_START] == 0:
+			return STAGE_DOUBLED if edge[EDGE_DOUBLED] else STAGE_PREFIX
+	elif loc == "root":
+		if stage in (STAGE_START, STAGE_PREFIX):
+			return STAGE_DOUBLED if edge[EDGE_DOUBLED] else STAGE_ROOT
+	elif loc == "suffix":
+		if edge[EDGE_END] == len(word):
+			if stage == STAGE_DOUBLED:
+				if word[edge[EDGE_START]] in morphemes.vowels_plus_y:
+					return STAGE_SUFFIX
+			elif stage != STAGE_SUFFIX:
+				return STAGE_SUFFIX
+	return None
+
+def find_best_path(lattice):
+	"edges of the best path through the lattice, by (matched chars, sum of squared morpheme lengths)"
+	word = lattice["word"]
+	word_len = len(word)
+	# (ix, stage) -> (matched, score, previous state, edge taken)
+	best = {(0, STAGE_START): (0, 0, None, None)}
+
+	def relax(state, matched, score, prev_state, edge):
+		if state not in best or (matched, score) > best[state][:2]:
+			best[state] = (matched, score, prev_state, edge)
+
+	for ix in range(word_len + 1):
+		for stage in (STAGE_START, STAGE_PREFIX, STAGE_ROOT, STAGE_DOUBLED, STAGE_SUFFIX):
+			state = (ix, stage)
+			if state not in best:
+				continue
+			matched, score = best[state][:2]
+			# leave a character unmatched
+			if ix < word_len and stage != STAGE_DOUBLED:
+				relax((ix + 1, stage), matched, score, state, None)
+			for edge in lattice["edges"][ix]:
+				stage_to = next_stage(stage, edge, word)
+				if stage_to is not None:
+					edge_len = edge[EDGE_END] - edge[EDGE_START]
+					relax((edge[EDGE_END], stage_to), matched + edge_len, score + edge_len * edge_len, state, edge)
+
+	final_state = None
+	for stage in (STAGE_START, STAGE_PREFIX, STAGE_ROOT, STAGE_SUFFIX):
+		state = (word_len, stage)
+		if state in best and (final_state is None or best[state][:2] > best[final_state][:2]):
+			final_state = state
+
+	path = []
+	state = final_state
+	while state is not None:
+		matched, score, prev_state, edge = best[state]
+		if edge is not None:
+			path.insert(0, edge)
+		state = prev_state
+	return path
+
+def all_entries_for_edge(lattice, edge):
+	"the candidates the greedy legs would have seen at this edge's position"
+	loc = edge[EDGE_LOC]
+	if loc == "prefix":
+		return morphemes.prefix_entries_for_ids(lattice["prefix_ids"][edge[EDGE_START]])
+	elif loc == "suffix":
+		return morphemes.suffix_entries_for_ids(lattice["suffix_ids"][edge[EDGE_END]])
+	else:
+		return morphemes.root_entries_for_indexes(lattice["root_indexes"])
+
+def save_edge(results, lattice, edge):
+	"add the leg for edge to results, in the same shape as morphemes_lib.save_result"
+	loc = edge[EDGE_LOC]
+	word = lattice["word"]
+	form_id = edge[EDGE_FORM_ID]
+	if loc == "prefix":
+		xk, x = morphemes.prefix_entries_for_ids([form_id]).popitem()
+	elif loc == "suffix":
+		xk, x = morphemes.suffix_entries_for_ids([form_id]).popitem()
+	else:
+		xk, x = morphemes.root_entries_for_indexes({form_id: edge[EDGE_START]}).popitem()
+	x["priority"] = "highest"
+	all_entries = all_entries_for_edge(lattice, edge)
+	all_entries[xk] = x
+
+	leg_obj = {
+		"leg": loc,
+		"xk": xk,
+		"form": word[edge[EDGE_START]:edge[EDGE_END]],
+		"span": (edge[EDGE_START], edge[EDGE_END]),
+		"meaning": x["meaning"],
+		"x": x,
+		"all_entries": all_entries
+	}
+	if loc == "prefix" and "category" in x:
+		leg_obj["category"] = x["category"]
+	results[loc] = [leg_obj]
+
+def find_entry_in_db_lattice(word):
+	"segment the word in one pass, results shaped like find_entry_in_db_multiple_strategies"
+	lattice = build_lattice(word)
+	if morphemes.instrumentation is not None:
+		morphemes.instrumentation.count("forms_compared", sum([len(start_edges) for start_edges in lattice["edges"]]))
+	path = find_best_path(lattice)
+
+	results = {
+		"word": word,
+		"matched_char_count": 0,
+		"unmatched_char_count": len(word),
+		"word_components_potential": []
+	}
+	ix = 0
+	for edge in path:
+		if edge[EDGE_START] > ix:
+			results["word_components_potential"].append(word[ix:edge[EDGE_START]])
+		save_edge(results, lattice, edge)
+		edge_len = edge[EDGE_END] - edge[EDGE_START]
+		results["matched_char_count"] += edge_len
+		results["unmatched_char_count"] -= edge_len
+		ix = edge[EDGE_END]
+	if ix < len(word):
+		results["word_components_potential"].append(word[ix:])
+
+	if debug > 0:
+		print(results)
+		print(morphemes.format_results(results, "+"))
+	return results
+
+# k-best search allows stacked affixes and compound roots: prefix* root* suffix*
+NBEST_STAGE_ORDER = {"prefix": STAGE_PREFIX, "root": STAGE_ROOT, "suffix": STAGE_SUFFIX}
+
+def nbest_next_stage(stage, edge, word):
+	"like next_stage, but each leg may repeat and prefixes may follow prefixes anywhere"
+	if stage == STAGE_DOUBLED:
+		if edge[EDGE_LOC] == "suffix" and word[edge[EDGE_START]] in morphemes.vowels_plus_y:
+			return STAGE_SUFFIX
+		return None
+	stage_to = NBEST_STAGE_ORDER[edge[EDGE_LOC]]
+	if stage_to < stage:
+		return None
+	if edge[EDGE_DOUBLED]:
+		return STAGE_DOUBLED
+	return stage_to
+
+def score_path(word_len, squares, unmatched):
+	"1.0 is the whole word as one morpheme, each unmatched character costs a full point"
+	return (squares - unmatched * word_len * word_len) / (word_len * word_len)
+
+def find_nbest_paths(lattice, k, beam_width):
+	"up to k distinct best paths, by beam search left to right over the lattice"
+	if k <= 0:
+		return []
+	word = lattice["word"]
+	word_len = len(word)
+	# hypothesis: (squares, unmatched, stage, pieces), a piece is an edge or an unmatched (start, end)
+	beams = [[] for ix in range(word_len + 1)]
+	beams[0].append((0, 0, STAGE_START, ()))
+
+	def rank(hyp):
+		return -score_path(word_len, hyp[0], hyp[1])
+
+	for ix in range(word_len):
+		beam = sorted(beams[ix], key=rank)[:beam_width]
+		for squares, unmatched, stage, pieces in beam:
+			if stage != STAGE_DOUBLED:
+				if len(pieces) > 0 and len(pieces[-1]) == 2:
+					# grow the unmatched run instead of starting another one
+					skipped = (pieces[-1][0], ix + 1)
+					beams[ix + 1].append((squares, unmatched + 1, stage, pieces[:-1] + (skipped,)))
+				else:
+					beams[ix + 1].append((squares, unmatched + 1, stage, pieces + ((ix, ix + 1),)))
+			for edge in lattice["edges"][ix]:
+				stage_to = nbest_next_stage(stage, edge, word)
+				if stage_to is not None:
+					edge_len = edge[EDGE_END] - edge[EDGE_START]
+					beams[edge[EDGE_END]].append((squares + edge_len * edge_len, unmatched, stage_to, pieces + (edge,)))
+
+	def final_rank(hyp):
+		# equal scores: prefer readings using more legs, then a single root,
+		# eg. dis+agree+ment as prefix, root, suffix
+		locs = [piece[EDGE_LOC] for piece in hyp[3] if len(piece) > 2]
+		return (rank(hyp), -len(set(locs)), abs(locs.count("root") - 1))
+
+	ret_paths = []
+	seen = set()
+	for squares, unmatched, stage, pieces in sorted(beams[word_len], key=final_rank):
+		if stage == STAGE_DOUBLED:
+			continue
+		# the same boundaries under other locs or groups sharing a form
+		spans = tuple((piece[0], piece[1]) for piece in pieces)
+		if spans in seen:
+			continue
+		seen.add(spans)
+		ret_paths.append((score_path(word_len, squares, unmatched), unmatched, pieces))
+		if len(ret_paths) >= k:
+			break
+	return ret_paths
+
+def find_nbest_in_db_lattice(word, k, beam_width=None):
+	"top k scored segmentations, best first"
+	if beam_width is None:
+		beam_width = max(16, 4 * k)
+	ret_segmentations = []
+	if len(word) == 0 or k <= 0:
+		return ret_segmentations
+	db = morphemes.get_morpheme_db()
+	lattice = build_lattice(word)
+	for score, unmatched, pieces in find_nbest_paths(lattice, k, beam_width):
+		segment_objs = []
+		for piece in pieces:
+			form = word[piece[0]:piece[1]]
+			if len(piece) == 2:
+				segment_objs.append({"loc": "unmatched", "form": form, "meaning": []})
+			else:
+				rxk, form_obj = db["form_table"][piece[EDGE_FORM_ID]]
+				segment_objs.append({"loc": piece[EDGE_LOC], "form": form, "meaning": db["morphemes"][rxk]["meaning"]})
+		ret_segmentations.append({
+			"word": word,
+			"segments": "+".join([segment_obj["form"] for segment_obj in segment_objs]),
+			"score": round(score, 4),
+			"matched_char_count": len(word) - unmatched,
+			"unmatched_char_count": unmatched,
+			"morphemes": segment_objs
+		})
+	return ret_segmentations
@@ -1,42 +1,140 @@
 # morphemes_lib.py
 
 import json
-import copy
+import contextvars
+import hashlib
+import os
+import pickle
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 import morphemes_wn as mdb
-import nltk
+import morphemes_index as mx
+import morphemes_lattice as mlat
+import morphemes_cache as mcache
+import morphemes_records as mrec
+import morphemes_stats as mstats
+import morphemes_examples as mex
 
-data_directory_path = "../../data/"
+data_directory_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "")
+cache_directory_path = os.path.join(data_directory_path, "cache", "")
+
+morphemes_filename = "morphemes.json"
+
+# bump when the shape of the cached indexes changes
+index_version = 1
+
+# loaded on first use, see get_morpheme_db
+morpheme_db = None
+morpheme_db_lock = threading.Lock()
+
+# the morphemes_segmenter.Segmenter running in this thread, if any; the
+# module functions read its database, caches and engine instead of the globals
+current_segmenter = contextvars.ContextVar("current_segmenter", default=None)
+
+# opt-in, see enable_segment_cache
+segment_cache = None
+# (engine, WordNet backend, db path) the segment cache was filled with
+segment_cache_settings = None
+
+# opt-in, see enable_instrumentation
+instrumentation = None
 
 debug = 0
 
-examples = []
+segmentation_engine = "lattice" # lattice | greedy
+
+# example lexicon for find_examples_for_morpheme, the database's own examples
+# when left empty, see set_examples
+examples = mex.ExampleList()
+example_index = None
+# the examples list and its version when example_index was built
+example_index_words = None
+example_index_version = None
+example_index_lock = threading.Lock()
 
 vowels = ["a", "e", "i", "o", "u"]
 vowels_plus_y = ["a", "e", "i", "o", "u", "y"]
 consonants = ["b","c","d","f","g","h","j","k","l","m","n","p","q","r","s","t","v","w","x","y","z"]
 
+def prefix_entries_for_ids(form_ids):
+	"prefix entries keyed by group, the first matching form of each group wins"
+	db = get_morpheme_db()
+	form_table = db["form_table"]
+	morphemes = db["morphemes"]
+	ret_prefixes = {}
+	# ids sorted into database order
+	for form_id in sorted(form_ids):
+		rxk, form_obj = form_table[form_id]
+		if rxk in ret_prefixes:
+			continue
+		rx = morphemes[rxk]
+		fform = form_obj["form"]
+		ret_prefix = {
+			"loc": "prefix",
+			"root": rx,
+			"form": fform,
+			"len": len(fform),
+			"meaning": rx["meaning"],
+			"id": form_id
+		}
+		if "category" in form_obj:
+			ret_prefix["category"] = form_obj["category"]
+		#rpk = rxk + "-" + fform ??
+		ret_prefixes[rxk] = ret_prefix
+	return ret_prefixes
+
+def suffix_entries_for_ids(form_ids):
+	"suffix entries keyed by group and form, every matching form is kept"
+	db = get_morpheme_db()
+	form_table = db["form_table"]
+	morphemes = db["morphemes"]
+	ret_suffixes = {}
+	for form_id in sorted(form_ids):
+		rxk, form_obj = form_table[form_id]
+		rx = morphemes[rxk]
+		fform = form_obj["form"]
+		ret_suffix = {
+			"loc": "suffix",
+			"root": rx,
+			"form": fform,
+			"len": len(fform),
+			"meaning": rx["meaning"],
+			"id": form_id
+		}
+		rsk = rxk + "-" + fform
+		ret_suffixes[rsk] = ret_suffix
+	return ret_suffixes
+
+def root_entries_for_indexes(form_indexes):
+	"root entries keyed by group, from form id -> offset of its first occurrence"
+	db = get_morpheme_db()
+	form_table = db["form_table"]
+	morphemes = db["morphemes"]
+	ret_roots = {}
+	for form_id in sorted(form_indexes):
+		rxk, form_obj = form_table[form_id]
+		if rxk in ret_roots:
+			continue
+		rx = morphemes[rxk]
+		fform = form_obj["form"]
+		ret_root = {
+			"loc": "embedded",
+			"root": rx,
+			"form": fform,
+			"len": len(fform),
+			"meaning": rx["meaning"],
+			"index": form_indexes[form_id],
+			"id": form_id
+		}
+		ret_roots[rxk] = ret_root
+	return ret_roots
+
 def find_prefixes_for_word_segment(word_array):
 	ret_prefixes = {}
 	if len(word_array) > 0:
 		word = word_array[0]
-		for rxk in morphemes:
-			rx = morphemes[rxk]
-			for form_obj in rx["forms"]:
-				if form_obj["loc"] == "prefix":
-					fform = form_obj["form"]
-					if word.startswith(fform):
-						ret_prefix = {
-							"loc": "prefix",
-							"root": rx,
-							"form": fform,
-							"len": len(fform),
-							"meaning": rx["meaning"]
-						}
-						if "category" in form_obj:
-							ret_prefix["category"] = form_obj["category"]
-						#rpk = rxk + "-" + fform ??
-						ret_prefixes[rxk] = ret_prefix
-						break
+		ret_prefixes = prefix_entries_for_ids(mx.match_prefix_ids(get_morpheme_db()["prefix_trie"], word))
 	else:
 		if debug > 0:
 			print("find_prefixes_for_word_segment: empty word_array")
@@ -46,22 +144,7 @@ def find_suffixes_for_word_segment(word_array):
 	ret_suffixes = {}
 	if len(word_array) > 0:
 		word = word_array[len(word_array)-1]
-		for rxk in morphemes:
-			rx = morphemes[rxk]
-			for form_obj in rx["forms"]:
-				if form_obj["loc"] == "suffix":
-					fform = form_obj["form"]
-					if word.endswith(fform):
-						ret_suffix = {
-							"loc": "suffix",
-							"root": rx,
-							"form": fform,
-							"len": len(fform),
-							"meaning": rx["meaning"]
-						}
-						rsk = rxk + "-" + fform
-						ret_suffixes[rsk] = ret_suffix
-						#break
+		ret_suffixes = suffix_entries_for_ids(mx.match_suffix_ids(get_morpheme_db()["suffix_trie"], word))
 	else:
 		if debug > 0:
 			print("find_suffixes_for_word_segment: empty word_array")
@@ -77,21 +160,12 @@ def find_roots_for_word_segment(word_array):
 				print("find_roots_for_word_segment: len word_array > 1: ", word_array)
 		else:
 			word = word_array[0]
-		for rxk in morphemes:
-			rx = morphemes[rxk]
-			for form_obj in rx["forms"]:
-				if form_obj["loc"] == "embedded":
-					fform = form_obj["form"]
-					if fform in word:
-						ret_root = {
-							"loc": "embedded",
-							"root": rx,
-							"form": fform,
-							"len": len(fform),
-							"meaning": rx["meaning"]
-						}
-						ret_roots[rxk] = ret_root
-						break
+		# offset of the first occurrence of each root form found in the word
+		form_indexes = {}
+		for start, form_id in mx.match_root_occurrences(get_morpheme_db()["root_automaton"], word):
+			if form_id not in form_indexes:
+				form_indexes[form_id] = start
+		ret_roots = root_entries_for_indexes(form_indexes)
 	else:
 		if debug > 0:
 			print("find_roots_for_word_segment: empty word_array")
@@ -132,6 +206,8 @@ def find_best_entry(strategy_leg, entries, form_array, strategy):
 		form_len = len(form)
 		best_ix = form_len - 1
 		if len(entries) > 0:
+			if instrumentation is not None:
+				instrumentation.count("forms_compared", len(entries))
 			for entryx in entries:
 				entry = entries[entryx]
 				if strategy == "max_len":
@@ -141,14 +217,18 @@ def find_best_entry(strategy_leg, entries, form_array, strategy):
 						best_entry["len"] = entry["len"]
 						best_entry["meaning"] = entry["meaning"]
 				elif strategy == "left_first":
-					entry_form_ix = form.index(entry["form"])
+					if "index" in entry:
+						entry_form_ix = entry["index"]
+					else:
+						entry_form_ix = form.index(entry["form"])
 					if entry_form_ix < best_ix and entry["len"] <= form_len:
 						best_entry["key"] = entryx
 						best_entry["form"] = entry["form"]
 						best_entry["len"] = entry["len"]
 						best_entry["meaning"] = entry["meaning"]
 						best_ix = entry_form_ix
-			all_entries[best_entry["key"]]["priority"] = "highest"
+			# a marked copy, the entries passed in stay untouched
+			all_entries[best_entry["key"]] = dict(entries[best_entry["key"]], priority="highest")
 			return best_entry, all_entries[best_entry["key"]], all_entries
 		else:
 			return {}, {}, all_entries
@@ -176,6 +256,8 @@ def find_max_entry(strategy_leg, entries, form_array):
 				print("find_max_entry: form_array len > 1")
 		form_len = len(form)
 		if len(entries) > 0:
+			if instrumentation is not None:
+				instrumentation.count("forms_compared", len(entries))
 			for entryx in entries:
 				entry = entries[entryx]
 				if entry["len"] > max_entry["len"] and entry["len"] <= form_len:
@@ -184,7 +266,8 @@ def find_max_entry(strategy_leg, entries, form_array):
 					max_entry["len"] = entry["len"]
 					max_entry["meaning"] = entry["meaning"]
 			if max_entry["key"] != "":
-				all_entries[max_entry["key"]]["priority"] = "highest"
+				# a marked copy, the entries passed in stay untouched
+				all_entries[max_entry["key"]] = dict(entries[max_entry["key"]], priority="highest")
 				return max_entry, all_entries[max_entry["key"]], all_entries
 			else:
 				return {}, {}, all_entries
@@ -201,8 +284,8 @@ def unique_keys(list1):
 	return unique_list
 
 def save_result(leg, xk_entry, x, prior_results, all_entries):
-	"add to results object"
-	ret_results = prior_results
+	"add to results object, prior_results is left unchanged"
+	ret_results = dict(prior_results)
 	wcp_update = []
 	leg_obj = {
 		"leg": leg,
@@ -215,7 +298,7 @@ def save_result(leg, xk_entry, x, prior_results, all_entries):
 	if leg == "prefix" and "category" in x:
 		leg_obj["category"] = x["category"]
 	if leg in ret_results:
-		ret_results[leg].append(leg_obj)
+		ret_results[leg] = ret_results[leg] + [leg_obj]
 	else:
 		ret_results[leg] = [leg_obj]
 
@@ -257,7 +340,7 @@ def find_likely_entries(prior_results, strategy_tuple, root_strategy):
 				find_roots = find_roots_for_word_segment(ret_results["word_components_potential"])
 				best_entry, best_rx, all_rx = find_best_entry(strategy_leg, find_roots, ret_results["word_components_potential"], root_strategy)
 				#if best_entry["key"] != "":
-				if len(max_entry) > 0:
+				if len(best_entry) > 0:
 					ret_results = save_result("root", best_entry, best_rx, ret_results, all_rx)
 		elif strategy_leg == "suffix":
 			find_suffixes = find_suffixes_for_word_segment(ret_results["word_components_potential"])
@@ -315,6 +398,7 @@ def find_entry_in_db_multiple_strategies(word):
 	return results
 
 def apply_consonant_doubling(prior_results, loc):
+	"prior_results is left unchanged, the doubled leg is a new object"
 	results = prior_results.copy()
 	if "suffix" in results:
 		if results["suffix"][0]["form"][0] in vowels_plus_y: # was just vowels
@@ -322,54 +406,249 @@ def apply_consonant_doubling(prior_results, loc):
 				cd_candidate = results[loc][0]["form"]
 				cd_candidate_last_char = cd_candidate[len(cd_candidate)-1]
 				if cd_candidate_last_char in consonants:
-					results[loc][0]["form"] += cd_candidate_last_char
+					results[loc] = [dict(results[loc][0], form=cd_candidate + cd_candidate_last_char)] + results[loc][1:]
 					results["unmatched_char_count"] = 0
 					results["matched_char_count"] += 1
 	return results
 
+def enable_segment_cache(maxsize=100000):
+	"memoize discover_segments in a size-bounded LRU cache, returned for its stats() and clear()"
+	global segment_cache
+	segment_cache = mcache.LRUCache(maxsize)
+	return segment_cache
+
+def disable_segment_cache():
+	global segment_cache
+	segment_cache = None
+
+def enable_instrumentation(keep_words=False):
+	"""record stage times and counters for every discover_segments call, returns
+	the morphemes_stats.Instrumentation for its stats() and write_json()"""
+	global instrumentation
+	instrumentation = mstats.Instrumentation(keep_words)
+	return instrumentation
+
+def disable_instrumentation():
+	global instrumentation
+	instrumentation = None
+
+def run_stage(stage, function, *args):
+	"function(*args), timed as a stage of the current word when instrumentation is on"
+	if instrumentation is None:
+		return function(*args)
+	return instrumentation.run_stage(stage, function, *args)
+
+def copy_leg(leg_obj):
+	"copy of one leg, its all_entries and entries; morpheme groups and WordNet nodes stay shared"
+	if leg_obj is None:
+		return None
+	ret_leg = dict(leg_obj)
+	if "all_entries" in leg_obj:
+		all_entries = {}
+		for entryx in leg_obj["all_entries"]:
+			all_entries[entryx] = dict(leg_obj["all_entries"][entryx])
+		ret_leg["all_entries"] = all_entries
+	if "x" in leg_obj:
+		# x is usually the same object as its entry in all_entries
+		if "all_entries" in leg_obj and leg_obj["all_entries"].get(leg_obj.get("xk")) is leg_obj["x"]:
+			ret_leg["x"] = ret_leg["all_entries"][leg_obj["xk"]]
+		else:
+			ret_leg["x"] = dict(leg_obj["x"])
+	if "wn_result" in leg_obj:
+		ret_leg["wn_result"] = mdb.copy_word_result(leg_obj["wn_result"])
+	return ret_leg
+
+def copy_results(results):
+	"copy of a results dict that callers can change freely, far cheaper than a deepcopy"
+	ret_results = dict(results)
+	ret_results["word_components_potential"] = list(results["word_components_potential"])
+	if "fallbacks" in results:
+		ret_results["fallbacks"] = list(results["fallbacks"])
+	for leg in ("prefix", "root", "suffix"):
+		if leg in results and results[leg] is not None:
+			ret_results[leg] = [copy_leg(leg_obj) for leg_obj in results[leg]]
+	return ret_results
+
 def discover_segments(word):
 	"top-level function, used by client application"
-	
-	results = find_entry_in_db_multiple_strategies(word)
-
-	if results["unmatched_char_count"] == 1:
-		results = apply_consonant_doubling(results, "root")
-	if results["unmatched_char_count"] == 1:
-		results = apply_consonant_doubling(results, "prefix")
-
-	temp_results = copy.deepcopy(results) #in case root, prefix are popped
-	if results["unmatched_char_count"] > 0 or format_results(results, "") != word:
-		results = mdb.find_entry_in_db_given_suffix(word, results)
-	if results["unmatched_char_count"] > 0 or format_results(results, "") != word:
-		results = copy.deepcopy(temp_results)
-		results = mdb.find_entry_in_db_given_suffix_and_prefix(word, results)
-	if results["unmatched_char_count"] > 0 or format_results(results, "") != word:
-		results = copy.deepcopy(temp_results)
-		results = mdb.find_entry_in_db_given_prefix(word, results)
+	if instrumentation is not None:
+		begin_token = instrumentation.begin_word(word)
+		try:
+			return lookup_segments(word)
+		finally:
+			instrumentation.end_word(begin_token)
+	return lookup_segments(word)
+
+def get_segment_settings():
+	"what cached segmentations depend on besides the word"
+	return (segmentation_engine, mdb.wordnet_backend, mdb.wordnet_db_path)
+
+def lookup_segments(word):
+	"find_segments through the segment cache, when there is one"
+	global segment_cache_settings
+	if segment_cache is not None:
+		# segmentation_engine is set by assignment, so check here rather than in a setter
+		settings = get_segment_settings()
+		if settings != segment_cache_settings:
+			segment_cache.clear()
+			segment_cache_settings = settings
+		results = segment_cache.get(word)
+		if results is mcache.MISSING:
+			results = find_segments(word)
+			segment_cache.put(word, copy_results(results))
+		else:
+			results = copy_results(results)
+		return results
+	return find_segments(word)
+
+# tried in order while the word is not fully segmented, see find_segments
+wordnet_fallbacks = [
+	("suffix", mdb.find_entry_in_db_given_suffix),
+	("suffix_and_prefix", mdb.find_entry_in_db_given_suffix_and_prefix),
+	("prefix", mdb.find_entry_in_db_given_prefix)
+]
+
+def find_segments(word):
+	"greedy or lattice segmentation, then the WordNet fallbacks"
+	segmenter = current_segmenter.get()
+	engine = segmenter.engine if segmenter is not None else segmentation_engine
+	if engine == "lattice":
+		results = run_stage("lattice", mlat.find_entry_in_db_lattice, word)
+	else:
+		results = run_stage("greedy", find_entry_in_db_multiple_strategies, word)
+
+	# the lattice already spans doubled consonants
+	if engine != "lattice":
+		if results["unmatched_char_count"] == 1:
+			results = run_stage("consonant_doubling", apply_consonant_doubling, results, "root")
+		if results["unmatched_char_count"] == 1:
+			results = run_stage("consonant_doubling", apply_consonant_doubling, results, "prefix")
+
+	# the fallbacks copy on write, so each one can start from the same results
+	temp_results = results
+	wn_lookups = 0
+	fallbacks = []
+	for fallback_name, fallback in wordnet_fallbacks:
+		if results["unmatched_char_count"] > 0 or format_results(results, "") != word:
+			results = run_stage("fallback_" + fallback_name, fallback, word, temp_results)
+			wn_lookups += results["wn_lookups"]
+			fallbacks.append(fallback_name)
+	if results is temp_results:
+		results = dict(results)
+	# WordNet lookups made for this word, and the fallbacks that made them, in order
+	results["wn_lookups"] = wn_lookups
+	results["fallbacks"] = fallbacks
 	return results
 
-def find_examples_for_morpheme(morpheme, loc):
-	ret_words = []
-	max_example_count = 10
-	example_count = 0
-	morpheme_len = len(morpheme)
-	for example in examples:
-		example_count += 1
-		if example_count > max_example_count:
-			break
-		example_len = len(example)
-		if example_len > morpheme_len:
-			if loc == "prefix":
-				if example.startswith(morpheme):
-					ret_words.append(example)
-			elif loc == "suffix":
-				if example.endswith(morpheme):
-					ret_words.append(example)
-			elif loc == "root":
-				within_example = example[1:][:example_len-2]
-				if morpheme in within_example:
-					ret_words.append(example)
-	return ret_words
+def discover_segments_nbest(word, k=5, beam_width=None):
+	"top k segmentations with scores, allowing stacked affixes, eg. un+believ+able+ness"
+	return mlat.find_nbest_in_db_lattice(word, k, beam_width)
+
+def compact_results(results):
+	"SegmentationRecord for a results dict, its to_dict() gives generate_final_results"
+	return mrec.SegmentationRecord.from_results(results)
+
+def discover_segments_compact(word):
+	return compact_results(discover_segments(word))
+
+def json_safe(value):
+	"copy of a results value with WordNet objects replaced by their names"
+	if isinstance(value, Mapping): # dicts, and lazy morphemes_wn.SynsetViews
+		return {key: json_safe(value[key]) for key in value}
+	elif isinstance(value, (list, tuple)):
+		return [json_safe(item) for item in value]
+	elif value is None or isinstance(value, (str, int, float, bool)):
+		return value
+	elif hasattr(value, "name"):
+		return value.name() # nltk Synset, Lemma
+	else:
+		return str(value)
+
+def init_batch_worker(wordnet_backend=None, wordnet_db_path=None):
+	"load the morpheme indexes and WordNet once per worker process"
+	if wordnet_backend is not None and (wordnet_backend, wordnet_db_path) != (mdb.wordnet_backend, mdb.wordnet_db_path):
+		mdb.set_wordnet_backend(wordnet_backend, wordnet_db_path) # spawned workers start from the defaults
+	get_morpheme_db()
+	mdb.load_wordnet()
+	mdb.get_lemma_names()
+
+def segment_for_batch(word):
+	"final results for one word, safe to send between processes"
+	return json_safe(generate_final_results(discover_segments(word)))
+
+def segment_compact_for_batch(word):
+	"SegmentationRecord for one word, safe to send between processes"
+	record = discover_segments_compact(word)
+	for segment in (record.prefix, record.root, record.suffix):
+		if segment is not None and segment.meaning is not None:
+			segment.meaning = json_safe(segment.meaning)
+	return record
+
+def discover_segments_batch(words, workers=None, chunksize=None, compact=False):
+	"""generate_final_results for many words, in input order, or with compact=True
+	a SegmentationRecord per word, whose to_dict() gives the same.
+	Repeated words are segmented once and share the same result object.
+	workers defaults to the number of CPUs, workers=1 runs in this process."""
+	words = list(words)
+	if len(words) == 0:
+		return []
+	segment_function = segment_compact_for_batch if compact else segment_for_batch
+	unique_words = list(dict.fromkeys(words))
+	if workers is None:
+		workers = os.cpu_count() or 1
+	workers = max(1, min(workers, len(unique_words)))
+
+	if workers == 1:
+		init_batch_worker()
+		word_results = [segment_function(word) for word in unique_words]
+	else:
+		if chunksize is None:
+			chunksize = max(1, len(unique_words) // (workers * 4))
+		# load here first, so forked workers inherit the indexes and a fresh cache file
+		get_morpheme_db()
+		with ProcessPoolExecutor(max_workers=workers, initializer=init_batch_worker, initargs=(mdb.wordnet_backend, mdb.wordnet_db_path)) as executor:
+			word_results = list(executor.map(segment_function, unique_words, chunksize=chunksize))
+
+	results_by_word = dict(zip(unique_words, word_results))
+	return [results_by_word[word] for word in words]
+
+def set_examples(words):
+	"use these words as the example lexicon, indexed on the next find_examples_for_morpheme"
+	global examples
+	examples = mex.ExampleList(words)
+
+def database_examples():
+	"every example word listed in the morpheme database, in database order"
+	db = get_morpheme_db()
+	ret_examples = []
+	for rxk in db["morphemes"]:
+		ret_examples.extend(db["morphemes"][rxk].get("examples", []))
+	return ret_examples
+
+def get_example_index():
+	"""index over examples, rebuilt when examples is replaced or, for the
+	ExampleList set_examples makes, changed in place. A plain list assigned
+	to examples is not watched for changes in place, call set_examples after."""
+	global example_index, example_index_words, example_index_version
+	with example_index_lock:
+		version = getattr(examples, "version", None)
+		if example_index is None or examples is not example_index_words or version != example_index_version:
+			words = list(examples) if len(examples) > 0 else database_examples()
+			example_index = mex.build_example_index(words)
+			example_index_words = examples
+			example_index_version = version
+		return example_index
+
+def find_examples_for_morpheme(morpheme, loc, max_example_count=10):
+	"up to max_example_count example words with the morpheme as prefix, suffix or root (embedded)"
+	index = get_example_index()
+	if loc == "prefix":
+		return mex.match_prefix_examples(index, morpheme, max_example_count)
+	elif loc == "suffix":
+		return mex.match_suffix_examples(index, morpheme, max_example_count)
+	elif loc in ("root", "embedded"):
+		return mex.match_root_examples(index, morpheme, max_example_count)
+	return []
 
 def format_results(results, delimiter):
 	"Assume one each of prefix, root, suffix"
@@ -426,7 +705,56 @@ def get_results_meaning(results, leg):
 def close_neo4j():
 	mdb.close_neo4j()
 
-morphemes_filename = "morphemes.json"
-morphemes_filepath = data_directory_path + morphemes_filename
-morphemes_file = open(morphemes_filepath, "r", encoding='utf-8')
-morphemes = json.loads(morphemes_file.read())
+def build_morpheme_db(morphemes):
+	"parsed database plus its lookup indexes"
+	form_table = mx.build_form_table(morphemes)
+	return {
+		"morphemes": morphemes,
+		"form_table": form_table,
+		"prefix_trie": mx.build_prefix_trie(form_table),
+		"suffix_trie": mx.build_suffix_trie(form_table),
+		"root_automaton": mx.build_root_automaton(form_table)
+	}
+
+def load_morpheme_db(morphemes_filepath):
+	"""parse morphemes.json and build its indexes, or reuse the compiled cache
+	written for the same file contents"""
+	with open(morphemes_filepath, "rb") as morphemes_file:
+		source = morphemes_file.read()
+	source_hash = hashlib.sha256(source).hexdigest()[:16]
+	cache_filepath = cache_directory_path + "morphemes-v{}-{}.pickle".format(index_version, source_hash)
+	try:
+		with open(cache_filepath, "rb") as cache_file:
+			return pickle.load(cache_file)
+	except (OSError, pickle.UnpicklingError, EOFError):
+		pass
+
+	db = build_morpheme_db(json.loads(source.decode("utf-8")))
+	try:
+		os.makedirs(cache_directory_path, exist_ok=True)
+		temp_filepath = cache_filepath + ".{}.tmp".format(os.getpid())
+		with open(temp_filepath, "wb") as cache_file:
+			pickle.dump(db, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_filepath, cache_filepath)
+	except OSError as e:
+		if debug > 0:
+			print("load_morpheme_db: could not write cache: ", e)
+	return db
+
+def get_morpheme_db():
+	"database and indexes, the running Segmenter's or loaded on first use"
+	global morpheme_db
+	segmenter = current_segmenter.get()
+	if segmenter is not None:
+		return segmenter.db
+	if morpheme_db is None:
+		with morpheme_db_lock:
+			if morpheme_db is None:
+				morpheme_db = load_morpheme_db(data_directory_path + morphemes_filename)
+	return morpheme_db
+
+def __getattr__(name):
+	"morphemes_lib.morphemes etc. still work, but only load the data when asked for"
+	if name in ("morphemes", "form_table", "prefix_trie", "suffix_trie", "root_automaton"):
+		return get_morpheme_db()[name]
+	raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
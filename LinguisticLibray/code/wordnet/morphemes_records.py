@@ -0,0 +1,146 @@
+# morphemes_records.py
+
+# Compact segmentation results for large batches. A results dict carries a
+# nested dict per leg, all_entries maps and references to whole morpheme
+# groups; a record keeps only the word, the counts and, per leg, its span in
+# the word and the integer id of its form in morphemes_lib's form table.
+# Meanings are looked up from the id when to_dict() is called.
+# Legs need not be adjacent: an incomplete segmentation leaves unmatched text
+# between them, and a form from a WordNet fallback may not be in the word at
+# all, or not where its leg belongs; such a segment has no span and keeps the
+# form as text.
+
+import morphemes_lib as morphemes
+
+NO_FORM = -1
+
+class Segment:
+	"one prefix, root or suffix: span in the word (None when it cannot be placed there), form id, and what the id cannot express"
+	__slots__ = ("start", "end", "form_id", "text", "meaning")
+
+	def __init__(self, start, end, form_id, text=None, meaning=None):
+		self.start = start
+		self.end = end
+		self.form_id = form_id
+		self.text = text # only when the form has no span in the word
+		self.meaning = meaning # only when not from a morpheme group, eg. a WordNet node list
+
+	def get_form(self, word):
+		if self.text is not None:
+			return self.text
+		return word[self.start:self.end]
+
+	def get_meaning(self):
+		if self.form_id != NO_FORM:
+			db = morphemes.get_morpheme_db()
+			rxk, form_obj = db["form_table"][self.form_id]
+			return db["morphemes"][rxk]["meaning"]
+		if self.meaning is not None:
+			return self.meaning
+		return []
+
+def find_leg_span(word, leg, leg_obj, lo, hi):
+	"""(start, end) of the leg's form in word[lo:hi], None when it is not there.
+	The lattice records the span of each edge it takes. Greedy prefixes start
+	the word and suffixes end it, and a greedy root is the first occurrence of
+	its form in the text left between the legs matched before it"""
+	form = leg_obj["form"]
+	if len(form) == 0:
+		return None
+	if "span" in leg_obj and word[leg_obj["span"][0]:leg_obj["span"][1]] == form:
+		start = leg_obj["span"][0]
+	elif leg == "prefix":
+		start = 0
+	elif leg == "suffix":
+		start = len(word) - len(form)
+	else:
+		start = word.find(form, lo, hi)
+	if start < lo or start + len(form) > hi or word[start:start+len(form)] != form:
+		return None
+	return start, start + len(form)
+
+def leg_meaning_source(leg_obj):
+	"(form id, explicit meaning) for a leg, matching morphemes_lib.get_results_meaning"
+	if "meaning" in leg_obj:
+		meaning = leg_obj["meaning"]
+		# the WordNet fallbacks can swap in another candidate's meaning, so find whose it is
+		entries = []
+		if "x" in leg_obj:
+			entries.append(leg_obj["x"])
+		if "all_entries" in leg_obj:
+			entries.extend(leg_obj["all_entries"].values())
+		for entry in entries:
+			if "id" in entry and entry["meaning"] is meaning:
+				return entry["id"], None
+		return NO_FORM, meaning
+	elif "wn_result" in leg_obj:
+		return NO_FORM, leg_obj["wn_result"]["word_node"]
+	else:
+		return NO_FORM, None
+
+class SegmentationRecord:
+	"a segmented word, to_dict() gives the same dict as morphemes_lib.generate_final_results"
+	__slots__ = ("word", "matched_char_count", "unmatched_char_count", "prefix", "root", "suffix")
+
+	def __init__(self, word, matched_char_count, unmatched_char_count, prefix=None, root=None, suffix=None):
+		self.word = word
+		self.matched_char_count = matched_char_count
+		self.unmatched_char_count = unmatched_char_count
+		self.prefix = prefix
+		self.root = root
+		self.suffix = suffix
+
+	@classmethod
+	def from_results(cls, results):
+		word = results["word"]
+		record = cls(word, results["matched_char_count"], results["unmatched_char_count"])
+		legs = {}
+		for leg in ("prefix", "root", "suffix"):
+			if leg in results and results[leg] != None and results[leg][0] != None:
+				legs[leg] = results[leg][0]
+		# the prefix and suffix spans bound where the root can be
+		spans = {}
+		for leg in ("prefix", "suffix"):
+			if leg in legs:
+				spans[leg] = find_leg_span(word, leg, legs[leg], 0, len(word))
+		lo = spans["prefix"][1] if spans.get("prefix") else 0
+		hi = spans["suffix"][0] if spans.get("suffix") else len(word)
+		if "root" in legs:
+			spans["root"] = find_leg_span(word, "root", legs["root"], lo, hi)
+		for leg in legs:
+			form_id, meaning = leg_meaning_source(legs[leg])
+			if spans[leg] is not None:
+				segment = Segment(spans[leg][0], spans[leg][1], form_id, None, meaning)
+			else:
+				segment = Segment(None, None, form_id, legs[leg]["form"], meaning)
+			setattr(record, leg, segment)
+		return record
+
+	def get_segments(self, delimiter):
+		forms = []
+		for segment in (self.prefix, self.root, self.suffix):
+			forms.append(segment.get_form(self.word) if segment is not None else "")
+		return delimiter.join(forms)
+
+	def is_complete(self):
+		"True when the segments spell the whole word"
+		return self.get_segments("") == self.word
+
+	def to_dict(self):
+		ret_results = {
+			"word": self.word,
+			"segments": self.get_segments("+"),
+			"matched_char_count": self.matched_char_count,
+			"unmatched_char_count": self.unmatched_char_count
+		}
+		for leg in ("prefix", "root", "suffix"):
+			segment = getattr(self, leg)
+			if segment is not None:
+				ret_results[leg] = {
+					"form": segment.get_form(self.word),
+					"meaning": segment.get_meaning()
+				}
+		return ret_results
+
+	def __repr__(self):
+		return "SegmentationRecord({!r}, {!r})".format(self.word, self.get_segments("+"))
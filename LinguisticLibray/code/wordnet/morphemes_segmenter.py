@@ -0,0 +1,90 @@
+# morphemes_segmenter.py
+
+# A Segmenter holds everything segmentation reads: the morpheme database and
+# its indexes, a WordNet reader, the lemma name set and its own caches. While
+# one of its methods runs, morphemes_lib and morphemes_wn read that state
+# through morphemes_lib.current_segmenter instead of their module globals, so
+# segmenters with different settings can run side by side. The database and
+# lemma names are never modified after __init__, the caches are locked and
+# the segmentation functions copy on write, so a single Segmenter can be
+# shared by the threads of a ThreadPoolExecutor.
+# With the "nltk" WordNet backend, synset reads are serialized (NLTK's reader
+# seeks shared file handles); the "sqlite" backend reads in parallel.
+
+import morphemes_lib as morphemes
+import morphemes_wn as mdb
+import morphemes_cache as mcache
+
+class Segmenter:
+	"discover_segments and friends over state owned by this object, safe to share between threads"
+
+	def __init__(self, engine="lattice", wordnet_backend=None, wordnet_db_path=None, cache_size=0, morphemes_filepath=None):
+		if engine not in ("lattice", "greedy"):
+			raise ValueError("unknown segmentation engine: {}".format(engine))
+		if morphemes_filepath is None:
+			morphemes_filepath = morphemes.data_directory_path + morphemes.morphemes_filename
+		if wordnet_backend is None:
+			wordnet_backend = mdb.wordnet_backend
+			wordnet_db_path = wordnet_db_path or mdb.wordnet_db_path
+		self.engine = engine
+		# everything loads here, nothing is lazily built while threads run
+		self.db = morphemes.load_morpheme_db(morphemes_filepath)
+		self.wordnet = mdb.open_wordnet(wordnet_backend, wordnet_db_path)
+		self.lemma_names = frozenset(self.wordnet.all_lemma_names())
+		# synset name -> computed lkup_wn fields, see morphemes_wn.SynsetView
+		self.synset_details = {}
+		self.segment_cache = None
+		self.word_cache = None
+		if cache_size > 0:
+			self.segment_cache = mcache.LRUCache(cache_size)
+			self.word_cache = mcache.LRUCache(cache_size)
+
+	def run(self, function, *args):
+		"call a morphemes_lib function with this segmenter's state"
+		token = morphemes.current_segmenter.set(self)
+		try:
+			return function(*args)
+		finally:
+			morphemes.current_segmenter.reset(token)
+
+	def segment(self, word):
+		"results dict, like morphemes_lib.discover_segments, recorded by its instrumentation too"
+		instrumentation = morphemes.instrumentation
+		if instrumentation is not None:
+			begin_token = instrumentation.begin_word(word)
+			try:
+				return self.lookup_segments(word)
+			finally:
+				instrumentation.end_word(begin_token)
+		return self.lookup_segments(word)
+
+	def lookup_segments(self, word):
+		if self.segment_cache is not None:
+			results = self.segment_cache.get(word)
+			if results is mcache.MISSING:
+				results = self.run(morphemes.find_segments, word)
+				self.segment_cache.put(word, morphemes.copy_results(results))
+			else:
+				results = morphemes.copy_results(results)
+			return results
+		return self.run(morphemes.find_segments, word)
+
+	def segment_final(self, word):
+		"generate_final_results as plain JSON types, with every WordNet field filled in"
+		results = self.segment(word)
+		return self.run(morphemes.json_safe, morphemes.generate_final_results(results))
+
+	def segment_nbest(self, word, k=5, beam_width=None):
+		return self.run(morphemes.discover_segments_nbest, word, k, beam_width)
+
+	def segment_compact(self, word):
+		"SegmentationRecord, call its to_dict() through run() to read this segmenter's database"
+		return morphemes.compact_results(self.segment(word))
+
+	def cache_stats(self):
+		stats = {}
+		if self.segment_cache is not None:
+			stats["segment_cache"] = self.segment_cache.stats()
+		if self.word_cache is not None:
+			stats["word_cache"] = self.word_cache.stats()
+		return stats
@@ -0,0 +1,130 @@
+# morphemes_stats.py
+
+# Opt-in instrumentation for discover_segments, see
+# morphemes_lib.enable_instrumentation. Each word gets a WordStats with the
+# wall time of every stage it went through (segmentation engine, consonant
+# doubling, each WordNet fallback) and counters such as forms compared and
+# WordNet calls. Finished words are folded into totals for the whole batch.
+# The word being segmented is tracked per thread, so one Instrumentation can
+# watch a thread pool.
+
+import contextvars
+import json
+import threading
+import time
+
+class WordStats:
+	"stage times in seconds and counters for one discover_segments call"
+	__slots__ = ("word", "elapsed", "stages", "counters")
+
+	def __init__(self, word):
+		self.word = word
+		self.elapsed = 0.0
+		self.stages = {}
+		self.counters = {}
+
+	def to_dict(self):
+		return {
+			"word": self.word,
+			"elapsed_ms": 1000 * self.elapsed,
+			"stages_ms": {stage: 1000 * self.stages[stage] for stage in self.stages},
+			"counters": dict(self.counters)
+		}
+
+class Instrumentation:
+	"stage timings and counters per word, aggregated over every word finished"
+
+	def __init__(self, keep_words=False):
+		self.lock = threading.Lock()
+		self.current = contextvars.ContextVar("current_word_stats", default=None)
+		self.keep_words = keep_words
+		self.clear()
+
+	def clear(self):
+		with self.lock:
+			self.word_count = 0
+			self.elapsed = 0.0
+			self.max_word = None
+			# stage -> [words that ran it, total seconds, max seconds]
+			self.stage_totals = {}
+			# counter -> [total, max in one word]
+			self.counter_totals = {}
+			self.words = []
+
+	def begin_word(self, word):
+		"start recording a word in this thread, returns the token for end_word"
+		return (self.current.set(WordStats(word)), time.perf_counter())
+
+	def end_word(self, begin_token):
+		token, start_time = begin_token
+		word_stats = self.current.get()
+		self.current.reset(token)
+		word_stats.elapsed = time.perf_counter() - start_time
+		with self.lock:
+			self.word_count += 1
+			self.elapsed += word_stats.elapsed
+			if self.max_word is None or word_stats.elapsed > self.max_word.elapsed:
+				self.max_word = word_stats
+			for stage in word_stats.stages:
+				totals = self.stage_totals.setdefault(stage, [0, 0.0, 0.0])
+				totals[0] += 1
+				totals[1] += word_stats.stages[stage]
+				totals[2] = max(totals[2], word_stats.stages[stage])
+			for counter in word_stats.counters:
+				totals = self.counter_totals.setdefault(counter, [0, 0])
+				totals[0] += word_stats.counters[counter]
+				totals[1] = max(totals[1], word_stats.counters[counter])
+			if self.keep_words:
+				self.words.append(word_stats)
+		return word_stats
+
+	def run_stage(self, stage, function, *args):
+		"call function, adding its wall time to the stage of the current word"
+		start_time = time.perf_counter()
+		try:
+			return function(*args)
+		finally:
+			word_stats = self.current.get()
+			if word_stats is not None:
+				word_stats.stages[stage] = word_stats.stages.get(stage, 0.0) + time.perf_counter() - start_time
+
+	def count(self, counter, n=1):
+		word_stats = self.current.get()
+		if word_stats is not None:
+			word_stats.counters[counter] = word_stats.counters.get(counter, 0) + n
+
+	def stats(self):
+		"aggregated stats for every word finished so far, plain JSON types"
+		with self.lock:
+			word_count = self.word_count
+			ret_stats = {
+				"words": word_count,
+				"elapsed_ms": 1000 * self.elapsed,
+				"mean_ms": 1000 * self.elapsed / word_count if word_count > 0 else 0.0,
+				"slowest_word": self.max_word.to_dict() if self.max_word is not None else None,
+				"stages": {},
+				"counters": {}
+			}
+			for stage in self.stage_totals:
+				words, total, max_time = self.stage_totals[stage]
+				ret_stats["stages"][stage] = {
+					"words": words,
+					"total_ms": 1000 * total,
+					"mean_ms": 1000 * total / words,
+					"max_ms": 1000 * max_time,
+					"share": total / self.elapsed if self.elapsed > 0 else 0.0
+				}
+			for counter in self.counter_totals:
+				total, max_count = self.counter_totals[counter]
+				ret_stats["counters"][counter] = {
+					"total": total,
+					"per_word": total / word_count if word_count > 0 else 0.0,
+					"max": max_count
+				}
+			if self.keep_words:
+				ret_stats["per_word"] = [word_stats.to_dict() for word_stats in self.words]
+			return ret_stats
+
+	def write_json(self, path):
+		with open(path, "w", encoding="utf-8") as stats_file:
+			json.dump(self.stats(), stats_file, indent=2)
@@ -1,13 +1,120 @@
 # morphemes_wn.py
 
-from nltk.corpus import wordnet as wn
+from collections.abc import Mapping
+import contextlib
+import threading
 import morphemes_lib as morphemes
+import morphemes_cache as mcache
 
 debug = 0
 
+# opt-in, see enable_word_cache
+word_cache = None
+
+# every lemma name in the local WordNet corpus, built on first use, see word_exists
+lemma_names = None
+
+# nltk | sqlite, sqlite reads the file build_wordnet_db.py exports instead of
+# importing NLTK and parsing its WordNet files, see set_wordnet_backend
+wordnet_backend = "nltk"
+wordnet_db_path = None # None is morphemes_wn_sqlite.default_db_path
+
+# nltk is slow to import, so the WordNet reader is loaded on first lookup
+wn = None
+wordnet_init_lock = threading.Lock()
+
+# NLTK's reader seeks and reads shared file handles to build synsets, so
+# reads through it are serialized, see get_reader_lock
+nltk_lock = threading.Lock()
+
+# the module functions below use the running Segmenter's reader, lemma names
+# and caches when there is one, see morphemes_lib.current_segmenter
+
+def open_wordnet(backend, db_path=None):
+	"a loaded WordNet reader for the backend"
+	if backend == "sqlite":
+		import morphemes_wn_sqlite as mwns
+		return mwns.SqliteWordNet(db_path or mwns.default_db_path)
+	from nltk.corpus import wordnet
+	# the lazy corpus loader is not safe to load from two threads at once
+	with nltk_lock:
+		wordnet.get_version()
+	return wordnet
+
+def get_wordnet():
+	global wn
+	segmenter = morphemes.current_segmenter.get()
+	if segmenter is not None:
+		return segmenter.wordnet
+	if wn is None:
+		with wordnet_init_lock:
+			if wn is None:
+				wn = open_wordnet(wordnet_backend, wordnet_db_path)
+	return wn
+
+def get_reader_lock(reader):
+	"what to hold while building synsets from reader, a no-op for readers threads can share"
+	if getattr(reader, "thread_safe", False):
+		return contextlib.nullcontext()
+	return nltk_lock
+
+def set_wordnet_backend(backend, db_path=None):
+	"switch between NLTK's reader and the SQLite export, dropping everything loaded from the old one"
+	global wordnet_backend, wordnet_db_path, wn, lemma_names
+	if backend not in ("nltk", "sqlite"):
+		raise ValueError("unknown WordNet backend: {}".format(backend))
+	wordnet_backend = backend
+	wordnet_db_path = db_path
+	wn = None
+	lemma_names = None
+	clear_synset_details()
+	if word_cache is not None:
+		word_cache.clear()
+	if morphemes.segment_cache is not None:
+		morphemes.segment_cache.clear()
+
+def get_lemma_names():
+	global lemma_names
+	segmenter = morphemes.current_segmenter.get()
+	if segmenter is not None:
+		return segmenter.lemma_names
+	if lemma_names is None:
+		reader = get_wordnet()
+		with wordnet_init_lock:
+			if lemma_names is None:
+				lemma_names = frozenset(reader.all_lemma_names())
+	return lemma_names
+
+def word_exists(word):
+	"""True when WordNet has synsets for the word, without building them.
+	Lemmas are a set lookup; other words go through morphy, which applies
+	the same exception lists and suffix rules wn.synsets does."""
+	lemma = word.lower()
+	if lemma in get_lemma_names():
+		return True
+	return get_wordnet().morphy(lemma) is not None
+
+def load_wordnet():
+	"force the lazy corpus reader to load now, eg. in a fresh worker process"
+	reader = get_wordnet()
+	reader.get_version()
+	return reader
+
+
+# The find_entry_in_db_given_* fallbacks copy on write: prior_results and the
+# leg objects it holds are never modified, so callers can try several
+# fallbacks from the same results without copying them first.
+
+def update_leg(results, leg, changes):
+	"replace results[leg][0] with a changed copy"
+	results[leg] = [dict(results[leg][0], **changes)] + results[leg][1:]
+
+def clear_leg(results, leg):
+	results[leg] = [None] + results[leg][1:]
 
 def find_entry_in_db_given_suffix(word, prior_results):
-	results = prior_results
+	results = dict(prior_results)
+	results["wn_lookups"] = 0
 	if "suffix" in results:
 		suffixes = results["suffix"][0]["all_entries"]
 		for sfx in suffixes:
@@ -15,115 +122,175 @@ def find_entry_in_db_given_suffix(word, prior_results):
 			sw_len = len(word) - len(suffix)
 			search_word = word[:sw_len]
 			word_result = find_word_in_db(search_word)
+			results["wn_lookups"] += 1
 			if word_result != None and word_result["word_node_id"] > 0:
 				if debug > 0:
 					print("found word in wn: ", search_word, word, word_result["word_node_id"])
 				word_node = word_result["word_node"]
 				if "prefix" in results:
-					results["prefix"][0]["form"] = search_word
-					results["prefix"][0]["db_form"] = word_node[0]["name"]
-					results["prefix"][0]["wn_result"] = word_result
+					update_leg(results, "prefix", {"form": search_word, "db_form": word_node[0]["name"], "wn_result": word_result})
 				else:
 					result = {
 						"form": search_word,
 						"db_form": word_node[0]["name"],
 						"wn_result": word_result
 					}
-					results["prefix"] = []
-					results["prefix"].append(result)
+					results["prefix"] = [result]
 				if "root" in results:
 					#results["root"][0]["form"] = ""
-					results["root"][0] = None
-				results["suffix"][0]["form"] = suffix
-				results["suffix"][0]["meaning"] = suffixes[sfx]["meaning"]
+					clear_leg(results, "root")
+				update_leg(results, "suffix", {"form": suffix, "meaning": suffixes[sfx]["meaning"]})
 				if morphemes.format_results(results, "") == word:
 					results["unmatched_char_count"] = 0
 					break
 	return results
 
 def find_entry_in_db_given_prefix(word, prior_results):
-	results = prior_results.copy()
+	results = dict(prior_results)
+	results["wn_lookups"] = 0
 	if "prefix" in results:
 		prefixes = results["prefix"][0]["all_entries"]
 		for pfx in prefixes:
 			prefix = prefixes[pfx]["form"]
 			search_word = word[len(prefix):]
 			word_result = find_word_in_db(search_word)
+			results["wn_lookups"] += 1
 			if word_result != None and word_result["word_node_id"] > 0:
 				if debug > 0:
 					print("found word in wn: ", search_word, word, word_result["word_node_id"])
 				word_node = word_result["word_node"]
 				if "suffix" in results:
-					results["suffix"][0]["form"] = search_word
-					results["suffix"][0]["db_form"] = word_node[0]["name"]
-					results["suffix"][0]["wn_result"] = word_result
+					update_leg(results, "suffix", {"form": search_word, "db_form": word_node[0]["name"], "wn_result": word_result})
 				else:
 					result = {
 						"form": search_word,
 						"db_form": word_node[0]["name"],
 						"wn_result": word_result
 					}
-					results["suffix"] = []
-					results["suffix"].append(result)
+					results["suffix"] = [result]
 				if "root" in results:
 					#results["root"][0]["form"] = ""
-					results["root"][0] = None
-				results["prefix"][0]["form"] = prefix
-				results["prefix"][0]["meaning"] = prefixes[pfx]["meaning"]
+					clear_leg(results, "root")
+				update_leg(results, "prefix", {"form": prefix, "meaning": prefixes[pfx]["meaning"]})
 				if morphemes.format_results(results, "") == word:
 					results["unmatched_char_count"] = 0
 					break
 	return results
 
+def stem_may_exist(search_word):
+	"lemma index check for whether find_word_in_wn can find the word, no synsets built"
+	if len(search_word) == 0:
+		return False
+	if word_exists(search_word):
+		return True
+	if search_word[len(search_word)-1] in morphemes.consonants:
+		for word_ending in ["e", "y"]:
+			if word_exists(search_word + word_ending):
+				return True
+	return False
+
+def stem_candidates(word, prefixes, suffixes):
+	"""(stem, pfx, sfx) for every prefix and suffix pair whose stem could be in
+	WordNet, deduplicated. Every candidate covers the whole word, so they tie
+	on coverage and keep the all_entries pair order, which is the order the
+	pairs were tried in before pruning and so picks the same first hit."""
+	candidates = {}
+	for sfx in suffixes:
+		for pfx in prefixes:
+			suffix = suffixes[sfx]["form"]
+			prefix = prefixes[pfx]["form"]
+			prefix_plus_root_len = len(word) - len(suffix)
+			search_word = word[len(prefix):prefix_plus_root_len]
+			# the same stem from groups sharing a form, the first pair wins as before
+			if search_word not in candidates:
+				candidates[search_word] = (pfx, sfx)
+	ret_candidates = []
+	for search_word in candidates:
+		if stem_may_exist(search_word):
+			pfx, sfx = candidates[search_word]
+			ret_candidates.append((search_word, pfx, sfx))
+	return ret_candidates
+
 def find_entry_in_db_given_suffix_and_prefix(word, prior_results):
-	results = prior_results.copy()
+	results = dict(prior_results)
+	results["wn_lookups"] = 0
 	if "suffix" in results and "prefix" in results:
 		suffixes = results["suffix"][0]["all_entries"]
 		prefixes = results["prefix"][0]["all_entries"]
 
-		oktocontinue = True
-		for sfx in suffixes:
-			if oktocontinue:
-				for pfx in prefixes:
-					if oktocontinue:
-						suffix = suffixes[sfx]["form"]
-						prefix = prefixes[pfx]["form"]
-						prefix_plus_root_len = len(word) - len(suffix)
-						prefix_plus_root = word[:prefix_plus_root_len]
-						search_word = prefix_plus_root[len(prefix):]
-						word_result = find_word_in_db(search_word)
-						if word_result != None and word_result["word_node_id"] > 0:
-							if debug > 0:
-								print("found word in wn: ", search_word, word, word_result["word_node_id"])
-							word_node = word_result["word_node"]
-							if "root" in results:
-								results["root"][0]["form"] = search_word
-								results["root"][0]["db_form"] = word_node[0]["name"]
-								results["root"][0]["wn_result"] = word_result
-							else:
-								result = {
-									"form": search_word,
-									"db_form": word_node[0]["name"],
-									"wn_result": word_result
-								}
-								results["root"] = []
-								results["root"].append(result)
-							results["prefix"][0]["form"] = prefix
-							results["prefix"][0]["meaning"] = prefixes[pfx]["meaning"]
-							results["suffix"][0]["form"] = suffix
-							results["suffix"][0]["meaning"] = suffixes[sfx]["meaning"]
-							if morphemes.format_results(results, "") == word:
-								results["unmatched_char_count"] = 0
-								oktocontinue = False
+		for search_word, pfx, sfx in stem_candidates(word, prefixes, suffixes):
+			suffix = suffixes[sfx]["form"]
+			prefix = prefixes[pfx]["form"]
+			word_result = find_word_in_db(search_word)
+			results["wn_lookups"] += 1
+			if word_result != None and word_result["word_node_id"] > 0:
+				if debug > 0:
+					print("found word in wn: ", search_word, word, word_result["word_node_id"])
+				word_node = word_result["word_node"]
+				if "root" in results:
+					update_leg(results, "root", {"form": search_word, "db_form": word_node[0]["name"], "wn_result": word_result})
+				else:
+					result = {
+						"form": search_word,
+						"db_form": word_node[0]["name"],
+						"wn_result": word_result
+					}
+					results["root"] = [result]
+				update_leg(results, "prefix", {"form": prefix, "meaning": prefixes[pfx]["meaning"]})
+				update_leg(results, "suffix", {"form": suffix, "meaning": suffixes[sfx]["meaning"]})
+				if morphemes.format_results(results, "") == word:
+					results["unmatched_char_count"] = 0
+					break
 	return results
 
+def enable_word_cache(maxsize=100000):
+	"memoize find_word_in_db in a size-bounded LRU cache, returned for its stats() and clear()"
+	global word_cache
+	word_cache = mcache.LRUCache(maxsize)
+	return word_cache
+
+def disable_word_cache():
+	global word_cache
+	word_cache = None
+
+def copy_word_result(word_result):
+	"copy callers can change without touching the cached result"
+	if word_result is None:
+		return None
+	ret_result = dict(word_result)
+	if ret_result["word_node"] is not None:
+		ret_result["word_node"] = list(ret_result["word_node"])
+	return ret_result
+
 def find_word_in_db(search_word):
+	if morphemes.instrumentation is not None:
+		morphemes.instrumentation.count("wn_lookups")
+	segmenter = morphemes.current_segmenter.get()
+	cache = segmenter.word_cache if segmenter is not None else word_cache
+	if cache is not None:
+		word_result = cache.get(search_word)
+		if word_result is mcache.MISSING:
+			word_result = find_word_in_wn(search_word)
+			cache.put(search_word, copy_word_result(word_result))
+		else:
+			if morphemes.instrumentation is not None:
+				morphemes.instrumentation.count("wn_cache_hits")
+			word_result = copy_word_result(word_result)
+		return word_result
+	return find_word_in_wn(search_word)
+
+def find_word_in_wn(search_word):
 	ret_result = {
 		"form": search_word,
 		"word_node_id": -1,
 		"word_node": None
 	}
-	word_node_id, word_node = get_node_by_name(search_word) #NB multiple nodes
+	if len(search_word) == 0:
+		return ret_result # affixes overlap, no stem left
+	# synset details are only built for words WordNet actually has
+	word_node_id, word_node = 0, []
+	if word_exists(search_word):
+		word_node_id, word_node = get_node_by_name(search_word) #NB multiple nodes
 	if word_node_id > 0:
 		ret_result["word_node_id"] = word_node_id
 		ret_result["word_node"] = word_node
@@ -131,6 +298,8 @@ def find_word_in_db(search_word):
 	elif search_word[len(search_word)-1] in morphemes.consonants:
 		for word_ending in ["e", "y"]:
 			temp_search_word = search_word + word_ending
+			if not word_exists(temp_search_word):
+				continue
 			word_node_id, word_node = get_node_by_name(temp_search_word)
 			if word_node_id > 0:
 				if debug > 0:
@@ -141,39 +310,91 @@ def find_word_in_db(search_word):
 				break
 		return ret_result
 
-def lkup_wn(word):
-	synsets = wn.synsets(word)
+def get_hyponym_objs(synset):
+	ret_hyponyms = []
+	for hn in synset.hyponyms():
+		hn_o = {
+			"name": hn.name(),
+			"lemma": hn.name().split('.')[0],
+			"pos": hn.pos()
+		}
+		ret_hyponyms.append(hn_o)
+	return ret_hyponyms
+
+# the fields of a lkup_wn synset, in order, and how to compute each
+synset_fields = {
+	"name": lambda synset: synset.name(),
+	"definition": lambda synset: synset.definition(),
+	"pos": lambda synset: synset.pos(),
+	"lemma_names": lambda synset: synset.lemma_names(),
+	"hypernyms": lambda synset: synset.hypernyms(),
+	"root_hypernyms": lambda synset: synset.root_hypernyms(),
+	"hypernym_paths": lambda synset: synset.hypernym_paths(),
+	"hyponyms": get_hyponym_objs,  #synset.hyponyms(),
+	"part_meronyms": lambda synset: synset.part_meronyms(),
+	"substance_meronyms": lambda synset: synset.substance_meronyms(),
+	"part_holonyms": lambda synset: synset.part_holonyms(),
+	"entailments": lambda synset: synset.entailments(),
+	"min_depth": lambda synset: synset.min_depth()
+}
+
+# synset name -> fields computed so far, shared by every SynsetView
+synset_details = {}
+
+def clear_synset_details():
+	synset_details.clear()
+
+def get_synset_details():
+	segmenter = morphemes.current_segmenter.get()
+	if segmenter is not None:
+		return segmenter.synset_details
+	return synset_details
+
+class SynsetView(Mapping):
+	"""a lkup_wn synset dict whose fields are computed on first access,
+	hypernym_paths and min_depth walk the whole hypernym graph"""
+
+	def __init__(self, synset, reader_lock=nltk_lock):
+		self.synset = synset
+		self.reader_lock = reader_lock
+		self.details = get_synset_details().setdefault(synset.name(), {})
+
+	def __getitem__(self, key):
+		if key not in self.details:
+			if key not in synset_fields:
+				raise KeyError(key)
+			with self.reader_lock:
+				self.details[key] = synset_fields[key](self.synset)
+		return self.details[key]
+
+	def __iter__(self):
+		return iter(synset_fields)
+
+	def __len__(self):
+		return len(synset_fields)
+
+	def __repr__(self):
+		return repr(dict(self))
+
+def lkup_wn(word, eager=False):
+	"""one entry per synset of the word: lazy SynsetViews, or with eager=True
+	plain dicts with every field computed, eg. for serializing"""
+	reader = get_wordnet()
+	reader_lock = get_reader_lock(reader)
+	with reader_lock:
+		synsets = reader.synsets(word)
 	ret_synsets = []
 	#print(synsets)
 	for synset in synsets:
-		ret_hyponyms = []
-		for hn in synset.hyponyms():
-			hn_o = {
-				"name": hn.name(),
-				"lemma": hn.name().split('.')[0],
-				"pos": hn.pos()
-			}
-			ret_hyponyms.append(hn_o)
-		ret_synset = {
-			"name": synset.name(),
-			"definition": synset.definition(),
-			"pos": synset.pos(),
-			"lemma_names": synset.lemma_names(),
-			"hypernyms": synset.hypernyms(),
-			"root_hypernyms": synset.root_hypernyms(),
-			"hypernym_paths": synset.hypernym_paths(),
-			"hyponyms": ret_hyponyms,  #synset.hyponyms(),
-			"part_meronyms": synset.part_meronyms(),
-			"substance_meronyms": synset.substance_meronyms(),
-			"part_holonyms": synset.part_holonyms(),
-			"part_holonyms": synset.part_holonyms(),
-			"entailments": synset.entailments(),
-			"min_depth": synset.min_depth()
-		}
+		ret_synset = SynsetView(synset, reader_lock)
+		if eager:
+			ret_synset = dict(ret_synset)
 		ret_synsets.append(ret_synset)
 	return ret_synsets
 
 def get_node_by_name(word):
+	if morphemes.instrumentation is not None:
+		morphemes.instrumentation.count("wn_synsets_calls")
 	synsets = lkup_wn(word)
 	l = len(synsets)
 	return l, synsets
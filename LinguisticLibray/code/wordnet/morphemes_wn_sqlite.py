@@ -0,0 +1,270 @@
+# morphemes_wn_sqlite.py
+
+# The WordNet data morphemes_wn uses, exported once from NLTK into a SQLite
+# file so fresh processes can look words up without importing NLTK or parsing
+# its index and data files. SqliteWordNet answers the subset of the NLTK
+# WordNet reader API that morphemes_wn calls: synsets, morphy,
+# all_lemma_names and get_version, with synsets that have the same methods
+# lkup_wn reads. Build the file with build_wordnet_db.py.
+
+import json
+import os
+import sqlite3
+import threading
+
+# bump when the tables change, old files are then rejected
+schema_version = 1
+
+default_db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "cache", "wordnet.sqlite")
+
+# NLTK's POS_LIST, the order wn.synsets tries parts of speech in
+pos_list = ["n", "v", "a", "r"]
+
+# synset methods returning other synsets, stored as rows of the relations table
+relation_names = [
+	"hypernyms",
+	"instance_hypernyms",
+	"root_hypernyms",
+	"hyponyms",
+	"part_meronyms",
+	"substance_meronyms",
+	"part_holonyms",
+	"entailments"
+]
+
+schema = """
+CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE synsets (id INTEGER PRIMARY KEY, name TEXT UNIQUE, pos TEXT, definition TEXT, lemma_names TEXT, min_depth INTEGER);
+CREATE TABLE lemma_index (lemma TEXT, pos TEXT, rank INTEGER, synset_id INTEGER, PRIMARY KEY (lemma, pos, rank)) WITHOUT ROWID;
+CREATE TABLE relations (synset_id INTEGER, relation TEXT, rank INTEGER, target_id INTEGER, PRIMARY KEY (synset_id, relation, rank)) WITHOUT ROWID;
+CREATE TABLE exceptions (pos TEXT, form TEXT, rank INTEGER, base TEXT, PRIMARY KEY (pos, form, rank)) WITHOUT ROWID;
+CREATE TABLE substitutions (pos TEXT, rank INTEGER, old TEXT, new TEXT, PRIMARY KEY (pos, rank)) WITHOUT ROWID;
+"""
+
+def build_wordnet_db(reader, path):
+	"""export an NLTK WordNet reader to a SQLite file at path, returns row counts.
+	The lemma index, exception lists and suffix substitutions are what
+	wn.synsets and wn.morphy read, so they come from the reader's internals."""
+	temp_path = "{}.{}.tmp".format(path, os.getpid())
+	if os.path.exists(temp_path):
+		os.remove(temp_path)
+	connection = sqlite3.connect(temp_path)
+	try:
+		connection.executescript(schema)
+		connection.execute("INSERT INTO info VALUES (?, ?)", ("schema_version", str(schema_version)))
+		connection.execute("INSERT INTO info VALUES (?, ?)", ("wordnet_version", reader.get_version()))
+
+		synset_ids = {}
+		synset_rows = []
+		for synset in reader.all_synsets():
+			synset_ids[synset.name()] = len(synset_ids)
+			synset_rows.append((
+				synset_ids[synset.name()],
+				synset.name(),
+				synset.pos(),
+				synset.definition(),
+				json.dumps(synset.lemma_names()),
+				synset.min_depth()
+			))
+		connection.executemany("INSERT INTO synsets VALUES (?, ?, ?, ?, ?, ?)", synset_rows)
+
+		relation_rows = []
+		for synset in reader.all_synsets():
+			for relation in relation_names:
+				for rank, target in enumerate(getattr(synset, relation)()):
+					relation_rows.append((synset_ids[synset.name()], relation, rank, synset_ids[target.name()]))
+		connection.executemany("INSERT INTO relations VALUES (?, ?, ?, ?)", relation_rows)
+
+		lemma_rows = []
+		for lemma, offsets_by_pos in reader._lemma_pos_offset_map.items():
+			for pos in pos_list:
+				for rank, offset in enumerate(offsets_by_pos.get(pos, [])):
+					synset = reader.synset_from_pos_and_offset(pos, offset)
+					lemma_rows.append((lemma, pos, rank, synset_ids[synset.name()]))
+		connection.executemany("INSERT INTO lemma_index VALUES (?, ?, ?, ?)", lemma_rows)
+
+		exception_rows = []
+		substitution_rows = []
+		for pos in pos_list:
+			for form, bases in reader._exception_map[pos].items():
+				for rank, base in enumerate(bases):
+					exception_rows.append((pos, form, rank, base))
+			for rank, (old, new) in enumerate(reader.MORPHOLOGICAL_SUBSTITUTIONS[pos]):
+				substitution_rows.append((pos, rank, old, new))
+		connection.executemany("INSERT INTO exceptions VALUES (?, ?, ?, ?)", exception_rows)
+		connection.executemany("INSERT INTO substitutions VALUES (?, ?, ?, ?)", substitution_rows)
+
+		connection.commit()
+	finally:
+		connection.close()
+	os.replace(temp_path, path)
+	return {
+		"synsets": len(synset_rows),
+		"relations": len(relation_rows),
+		"lemma_index": len(lemma_rows),
+		"exceptions": len(exception_rows)
+	}
+
+class SqliteSynset:
+	"the parts of an NLTK Synset that lkup_wn reads, related synsets are loaded on demand"
+	__slots__ = ("wordnet", "synset_id", "synset_name", "synset_pos", "synset_definition", "synset_lemma_names", "synset_min_depth")
+
+	def __init__(self, wordnet, row):
+		self.wordnet = wordnet
+		self.synset_id, self.synset_name, self.synset_pos, self.synset_definition, lemma_names, self.synset_min_depth = row
+		self.synset_lemma_names = json.loads(lemma_names)
+
+	def name(self):
+		return self.synset_name
+
+	def pos(self):
+		return self.synset_pos
+
+	def definition(self):
+		return self.synset_definition
+
+	def lemma_names(self):
+		return list(self.synset_lemma_names)
+
+	def min_depth(self):
+		return self.synset_min_depth
+
+	def related(self, relation):
+		return self.wordnet.related_synsets(self.synset_id, relation)
+
+	def hypernyms(self):
+		return self.related("hypernyms")
+
+	def instance_hypernyms(self):
+		return self.related("instance_hypernyms")
+
+	def root_hypernyms(self):
+		return self.related("root_hypernyms")
+
+	def hyponyms(self):
+		return self.related("hyponyms")
+
+	def part_meronyms(self):
+		return self.related("part_meronyms")
+
+	def substance_meronyms(self):
+		return self.related("substance_meronyms")
+
+	def part_holonyms(self):
+		return self.related("part_holonyms")
+
+	def entailments(self):
+		return self.related("entailments")
+
+	def hypernym_paths(self):
+		"same walk as NLTK, instance hypernyms included"
+		paths = []
+		hypernyms = self.hypernyms() + self.instance_hypernyms()
+		if len(hypernyms) == 0:
+			paths = [[self]]
+		for hypernym in hypernyms:
+			for ancestor_list in hypernym.hypernym_paths():
+				ancestor_list.append(self)
+				paths.append(ancestor_list)
+		return paths
+
+	def __eq__(self, other):
+		return isinstance(other, SqliteSynset) and self.synset_name == other.synset_name
+
+	def __hash__(self):
+		return hash(self.synset_name)
+
+	def __repr__(self):
+		return "Synset('{}')".format(self.synset_name)
+
+class SqliteWordNet:
+	"read-only WordNet lookups against a file made by build_wordnet_db"
+
+	# every thread gets its own connection, see morphemes_wn.get_reader_lock
+	thread_safe = True
+
+	def __init__(self, path=default_db_path):
+		if not os.path.exists(path):
+			raise FileNotFoundError("no WordNet database at {}, run build_wordnet_db.py first".format(path))
+		self.path = path
+		# sqlite3 connections cannot move between threads or survive a fork
+		self.local = threading.local()
+		info = dict(self.query("SELECT key, value FROM info"))
+		if info.get("schema_version") != str(schema_version):
+			raise ValueError("{} has schema version {}, expected {}, rebuild it with build_wordnet_db.py".format(path, info.get("schema_version"), schema_version))
+		self.version = info["wordnet_version"]
+		self.substitutions = {pos: [] for pos in pos_list}
+		for pos, old, new in self.query("SELECT pos, old, new FROM substitutions ORDER BY pos, rank"):
+			self.substitutions[pos].append((old, new))
+		# synset id -> SqliteSynset, synsets are immutable so threads can share them
+		self.synsets_by_id = {}
+
+	def get_connection(self):
+		connection = getattr(self.local, "connection", None)
+		if connection is None or self.local.pid != os.getpid():
+			connection = sqlite3.connect("file:{}?mode=ro".format(self.path), uri=True)
+			self.local.connection = connection
+			self.local.pid = os.getpid()
+		return connection
+
+	def query(self, sql, args=()):
+		return self.get_connection().execute(sql, args).fetchall()
+
+	def get_version(self):
+		return self.version
+
+	def all_lemma_names(self):
+		return iter([row[0] for row in self.query("SELECT DISTINCT lemma FROM lemma_index")])
+
+	def synsets_for_ids(self, synset_ids):
+		ret_synsets = []
+		for synset_id in synset_ids:
+			synset = self.synsets_by_id.get(synset_id)
+			if synset is None:
+				row = self.query("SELECT id, name, pos, definition, lemma_names, min_depth FROM synsets WHERE id = ?", (synset_id,))[0]
+				synset = SqliteSynset(self, row)
+				self.synsets_by_id[synset_id] = synset
+			ret_synsets.append(synset)
+		return ret_synsets
+
+	def related_synsets(self, synset_id, relation):
+		rows = self.query("SELECT target_id FROM relations WHERE synset_id = ? AND relation = ? ORDER BY rank", (synset_id, relation))
+		return self.synsets_for_ids([row[0] for row in rows])
+
+	def synset(self, name):
+		rows = self.query("SELECT id FROM synsets WHERE name = ?", (name,))
+		if len(rows) == 0:
+			raise ValueError("no synset named {}".format(name))
+		return self.synsets_for_ids([rows[0][0]])[0]
+
+	def has_lemma(self, form, pos):
+		return len(self.query("SELECT 1 FROM lemma_index WHERE lemma = ? AND pos = ? LIMIT 1", (form, pos))) > 0
+
+	def _morphy(self, form, pos):
+		"NLTK's _morphy: the exception list or one round of suffix rules, then what is in the index"
+		bases = [row[0] for row in self.query("SELECT base FROM exceptions WHERE pos = ? AND form = ? ORDER BY rank", (pos, form))]
+		if len(bases) > 0:
+			forms = bases
+		else:
+			forms = [form[:-len(old)] + new for old, new in self.substitutions[pos] if form.endswith(old)]
+		ret_forms = []
+		for candidate in [form] + forms:
+			if candidate not in ret_forms and self.has_lemma(candidate, pos):
+				ret_forms.append(candidate)
+		return ret_forms
+
+	def morphy(self, form, pos=None):
+		for pos in [pos] if pos else pos_list:
+			analyses = self._morphy(form, pos)
+			if analyses:
+				return analyses[0]
+		return None
+
+	def synsets(self, lemma, pos=None):
+		lemma = lemma.lower()
+		ret_synsets = []
+		for pos in [pos] if pos else pos_list:
+			for form in self._morphy(lemma, pos):
+				rows = self.query("SELECT synset_id FROM lemma_index WHERE lemma = ? AND pos = ? ORDER BY rank", (form, pos))
+				ret_synsets.extend(self.synsets_for_ids([row[0] for row in rows]))
+		return ret_synsets
@@ -0,0 +1,141 @@
+"""
+parallel_generation.py - Deterministic sharded word generation across processes
+
+Splits a run into shards, each generating with its own random.Random seeded
+from a numpy SeedSequence spawned off the master seed, so the shards' streams
+are independent. Shards run in a pool of worker processes, each holding one
+generator, and are merged in shard order keeping the first occurrence of every
+word. Rounds of fresh shards top the run up until count distinct words are
+found, each round drawing more words per shard as the share of duplicates
+grows. The result only depends on the master seed, the shard count and count,
+not on the number of processes or which finishes first.
+
+Usage: python parallel_generation.py COUNT [--generator word|syllable] [--seed 0]
+                                     [--shards 8] [--processes N] [--syllables N]
+                                     [--output PATH] [--format jsonl|csv]
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from word_generator_loader import load_word_generator
+from word_sink import FORMATS, write_words
+
+GENERATORS = ("word", "syllable")
+
+# Rounds in a row without a new word before a run gives up on reaching count
+max_empty_rounds = 5
+# Least a round is allowed to draw, however small count is
+min_round_words = 10000
+
+# The generator of this worker process, see init_worker
+worker_generator = None
+worker_kind = None
+
+
+def make_generator(kind: str):
+    if kind == "word":
+        return load_word_generator().WordGenerator()
+    if kind == "syllable":
+        import syllable_word_generator
+        return syllable_word_generator.SyllableWordGenerator()
+    raise ValueError(f"Unknown generator: {kind}")
+
+
+def init_worker(kind: str):
+    global worker_generator, worker_kind
+    worker_generator = make_generator(kind)
+    worker_kind = kind
+
+
+def shard_seeds(master: np.random.SeedSequence, shards: int) -> List[int]:
+    """Seeds for the next round of shards, each from its own child of the master sequence."""
+    return [int.from_bytes(child.generate_state(4).tobytes(), 'little') for child in master.spawn(shards)]
+
+
+def generate_shard(seed: int, count: int, syllable_count: Optional[int] = None) -> List[Dict]:
+    """count words from this worker's generator, drawing from a random.Random(seed).
+
+    The syllable generator picks each word's syllable count from the same
+    stream when syllable_count is None.
+    """
+    worker_generator.rng = random.Random(seed)
+    if worker_kind == "word":
+        return list(worker_generator.iter_words(count))
+    return [worker_generator.generate_word(syllable_count or worker_generator.rng.randint(1, 4))
+            for _ in range(count)]
+
+
+def generate_parallel(count: int, kind: str = "word", seed: int = 0,
+                      shards: Optional[int] = None, processes: Optional[int] = None,
+                      syllable_count: Optional[int] = None) -> List[Dict]:
+    """count distinct words generated in parallel, reproducible from seed and shards.
+
+    shards defaults to processes, which defaults to the CPU count; pass shards
+    explicitly to get the same words on machines with different core counts.
+    Returns fewer than count words when max_empty_rounds rounds in a row find
+    nothing new, which for a small word space usually means every word it can
+    produce has been found, but is not a proof of it.
+    """
+    processes = processes or os.cpu_count() or 1
+    shards = shards or processes
+    master = np.random.SeedSequence(seed)
+    seen = set()
+    words = []
+    drawn = 0
+    empty_rounds = 0
+    with ProcessPoolExecutor(processes, initializer=init_worker, initargs=(kind,)) as pool:
+        while len(words) < count and empty_rounds < max_empty_rounds:
+            # Draw enough for the missing words at the duplicate rate seen so far,
+            # capped so a word space that has run dry costs little per round
+            wanted = count - len(words)
+            if len(words) > 0:
+                wanted = min(-(-wanted * drawn // len(words)), max(count, min_round_words))
+            per_shard = -(-wanted // shards)
+            futures = [pool.submit(generate_shard, shard_seed, per_shard, syllable_count)
+                       for shard_seed in shard_seeds(master, shards)]
+            added = 0
+            # Merge in shard order, whatever order the shards finish in
+            for future in futures:
+                for word in future.result():
+                    drawn += 1
+                    if len(words) < count and word["word"] not in seen:
+                        seen.add(word["word"])
+                        words.append(word)
+                        added += 1
+            empty_rounds = empty_rounds + 1 if added == 0 else 0
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate distinct words in parallel, reproducibly")
+    parser.add_argument("count", type=int, help="distinct words to generate")
+    parser.add_argument("--generator", choices=GENERATORS, default="word")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--shards", type=int, default=8, help="shards per round, part of what makes a run reproducible")
+    parser.add_argument("--processes", type=int, help="worker processes, the CPU count by default")
+    parser.add_argument("--syllables", type=int, help="syllable count for the syllable generator, random 1-4 by default")
+    parser.add_argument("--output", help="write the words to this JSONL or CSV file")
+    parser.add_argument("--format", choices=FORMATS, help="output format, from the file extension by default")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    words = generate_parallel(args.count, args.generator, args.seed, args.shards, args.processes, args.syllables)
+    elapsed = time.perf_counter() - start_time
+    print(f"{len(words)} distinct words in {elapsed:.2f} s")
+    if args.output:
+        write_words(words, args.output, args.format)
+        print(f"Wrote {len(words)} words to {args.output}")
+    else:
+        for word in words[:10]:
+            print(word["word"])
+
+
+if __name__ == "__main__":
+    main()
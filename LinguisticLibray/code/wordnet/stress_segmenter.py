@@ -0,0 +1,91 @@
+# stress_segmenter.py
+
+# Segments the example words sequentially, then again from a thread pool,
+# with a lattice and a greedy Segmenter interleaved in the same pool, and
+# checks every concurrent result against the sequential one. Exits 1 on any
+# difference. On free-threaded CPython (python3.13t) the threads really run
+# in parallel; use --backend sqlite there, NLTK's reader is serialized.
+# Usage: python stress_segmenter.py [--threads 8] [--rounds 3] [--max-words 0]
+#                                   [--backend nltk|sqlite] [--db-path PATH] [--cache-size 0]
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import benchmark_nbest
+import morphemes_lib as morphemes
+import morphemes_segmenter as mseg
+import morphemes_wn as mdb
+
+def segment_task(segmenter, word):
+	"everything a caller might read for one word, as a comparable string"
+	final_results = segmenter.segment_final(word)
+	nbest = segmenter.run(morphemes.json_safe, segmenter.segment_nbest(word, 3))
+	return json.dumps([final_results, nbest], sort_keys=True)
+
+def main():
+	parser = argparse.ArgumentParser(description="Check that concurrent Segmenter use matches sequential use")
+	parser.add_argument("--threads", type=int, default=8)
+	parser.add_argument("--rounds", type=int, default=3, help="times each word is segmented concurrently")
+	parser.add_argument("--max-words", type=int, default=0, help="0 for every example word")
+	parser.add_argument("--backend", choices=["nltk", "sqlite"], default=None, help="WordNet backend, default morphemes_wn's")
+	parser.add_argument("--db-path", default=None, help="SQLite WordNet file for --backend sqlite")
+	parser.add_argument("--cache-size", type=int, default=0, help="LRU cache size per segmenter, 0 for none")
+	args = parser.parse_args()
+
+	gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+	print("python {}, GIL {}".format(sys.version.split()[0], "enabled" if gil_enabled else "disabled"))
+
+	if args.backend is not None:
+		mdb.set_wordnet_backend(args.backend, args.db_path)
+	segmenters = {}
+	for engine in ("lattice", "greedy"):
+		segmenters[engine] = mseg.Segmenter(engine, cache_size=args.cache_size)
+	words = benchmark_nbest.get_example_words(args.max_words)
+
+	start_time = time.perf_counter()
+	expected = {}
+	for engine in segmenters:
+		for word in words:
+			expected[(engine, word)] = segment_task(segmenters[engine], word)
+	print("sequential: {} words x {} engines in {:.2f} s".format(len(words), len(segmenters), time.perf_counter() - start_time))
+
+	# the module level pipeline must agree with the lattice segmenter
+	module_mismatches = 0
+	for word in words:
+		module_results = morphemes.json_safe(morphemes.generate_final_results(morphemes.discover_segments(word)))
+		if json.dumps(module_results, sort_keys=True) != json.dumps(json.loads(expected[("lattice", word)])[0], sort_keys=True):
+			module_mismatches += 1
+
+	tasks = [key for key in expected] * args.rounds
+	random.Random(0).shuffle(tasks)
+	start_time = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=args.threads) as executor:
+		futures = [executor.submit(segment_task, segmenters[engine], word) for engine, word in tasks]
+		mismatches = []
+		errors = []
+		for task, future in zip(tasks, futures):
+			try:
+				if future.result() != expected[task]:
+					mismatches.append(task)
+			except Exception as e:
+				errors.append((task, repr(e)))
+	elapsed = time.perf_counter() - start_time
+	print("concurrent: {} tasks on {} threads in {:.2f} s".format(len(tasks), args.threads, elapsed))
+	for engine in segmenters:
+		stats = segmenters[engine].cache_stats()
+		if stats:
+			print("{} caches: {}".format(engine, stats))
+
+	for task in mismatches[:10]:
+		print("mismatch:", task)
+	for task, error in errors[:10]:
+		print("error:", task, error)
+	print("{} mismatches, {} errors, {} differences from discover_segments".format(len(mismatches), len(errors), module_mismatches))
+	if mismatches or errors or module_mismatches:
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -7,15 +7,20 @@ Example: python syllable_word_generator.py 2
 
 from nltk.tokenize import SyllableTokenizer
 from nltk import download
+from morpheme_table import MorphemeTable
 import random
 import json
 import os
 import re
 import sys
+from typing import Optional
 
 
 class SyllableWordGenerator:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # A private random.Random makes the words reproducible; the global random module otherwise
+        self.rng = random.Random(seed) if seed is not None else random
+
         try:
             self.syllable_tokenizer = SyllableTokenizer()
         except LookupError:
@@ -29,40 +34,31 @@ class SyllableWordGenerator:
         with open(morphemes_enhanced_path, 'r', encoding='utf-8') as file:
             self.morphemes = json.load(file)
 
-        # Process morphemes into categories
+        # Process morphemes into categories, each group by its first form
         self.prefixes = {'light': {}, 'heavy': {}}
         self.roots = {'light': {}, 'heavy': {}}
         self.suffixes = {'light': {}, 'heavy': {}}
 
-        for key, value in self.morphemes.items():
-            if not isinstance(value, dict) or 'forms' not in value or not value['forms']:
-                continue
-
-            form = value['forms'][0]
-            loc = form.get('loc', '')
-
-            # Clean the form and get syllable count
-            clean_form = self._clean_morpheme(form.get('form', ''))
-            if not clean_form:
-                continue
-
-            # Get syllable information from the enhanced dataset
-            syllables_info = value.get('syllables', {})
-            syllable_count = syllables_info.get('count', 1)
-            syllable_components = syllables_info.get('components', [])
+        self.table = MorphemeTable.from_morphemes(self.morphemes)
+        weights = [('light', self.table.mask(max_syllables=1)), ('heavy', self.table.mask(min_syllables=2))]
+        categories = [(self.prefixes, 'prefix'), (self.roots, 'embedded'), (self.suffixes, 'suffix')]
+        for category, loc in categories:
+            loc_mask = self.table.mask(loc=loc, first_form_only=True)
+            for weight, weight_mask in weights:
+                for row in self.table.rows(loc_mask & weight_mask):
+                    value = self.morphemes[self.table.group_key(row)]
 
-            weight = 'heavy' if syllable_count > 1 else 'light'
+                    # Clean the form
+                    clean_form = self._clean_morpheme(str(self.table.forms[row]))
+                    if not clean_form:
+                        continue
 
-            value_with_clean_form = dict(value)
-            value_with_clean_form['forms'][0]['form'] = clean_form
-            value_with_clean_form['syllable_components'] = syllable_components
+                    # Syllable information from the enhanced dataset
+                    value_with_clean_form = dict(value)
+                    value_with_clean_form['forms'][0]['form'] = clean_form
+                    value_with_clean_form['syllable_components'] = value.get('syllables', {}).get('components', [])
 
-            if loc == 'prefix':
-                self.prefixes[weight][clean_form] = dict(value_with_clean_form, syllables=syllable_count)
-            elif loc == 'embedded':  # root
-                self.roots[weight][clean_form] = dict(value_with_clean_form, syllables=syllable_count)
-            elif loc == 'suffix':
-                self.suffixes[weight][clean_form] = dict(value_with_clean_form, syllables=syllable_count)
+                    category[weight][clean_form] = dict(value_with_clean_form, syllables=int(self.table.syllables[row]))
 
     def _clean_morpheme(self, morpheme: str) -> str:
         """Clean a morpheme by removing hyphens and special characters."""
@@ -96,7 +92,7 @@ class SyllableWordGenerator:
 
         # For 1-syllable words, just use a root
         if syllable_count == 1:
-            root, root_info = random.choice(list(self.roots['light'].items()))
+            root, root_info = self.rng.choice(list(self.roots['light'].items()))
             return {
                 'word': root,
                 'syllable_breakdown': self._get_syllable_components(root_info),
@@ -111,10 +107,10 @@ class SyllableWordGenerator:
         remaining = syllable_count
 
         # Try to add prefix
-        if syllable_count >= 2 and random.random() > 0.3:
+        if syllable_count >= 2 and self.rng.random() > 0.3:
             prefix_weight = 'heavy' if remaining >= 2 else 'light'
             if self.prefixes[prefix_weight]:
-                prefix, prefix_info = random.choice(list(self.prefixes[prefix_weight].items()))
+                prefix, prefix_info = self.rng.choice(list(self.prefixes[prefix_weight].items()))
                 prefix_syllables = prefix_info.get('syllables', 1)
                 if prefix_syllables <= remaining:
                     components['prefix'] = {'form': prefix, 'meaning': prefix_info.get('meaning', [])}
@@ -125,7 +121,7 @@ class SyllableWordGenerator:
         if remaining > 0:
             root_weight = 'heavy' if remaining >= 2 else 'light'
             if self.roots[root_weight]:
-                root, root_info = random.choice(list(self.roots[root_weight].items()))
+                root, root_info = self.rng.choice(list(self.roots[root_weight].items()))
                 root_syllables = root_info.get('syllables', 1)
                 if root_syllables <= remaining:
                     components['root'] = {'form': root, 'meaning': root_info.get('meaning', [])}
@@ -136,7 +132,7 @@ class SyllableWordGenerator:
         if remaining > 0:
             suffix_weight = 'heavy' if remaining >= 2 else 'light'
             if self.suffixes[suffix_weight]:
-                suffix, suffix_info = random.choice(list(self.suffixes[suffix_weight].items()))
+                suffix, suffix_info = self.rng.choice(list(self.suffixes[suffix_weight].items()))
                 if suffix_info.get('syllables', 1) == remaining:
                     components['suffix'] = {'form': suffix, 'meaning': suffix_info.get('meaning', [])}
                     syllable_parts.extend(self._get_syllable_components(suffix_info))
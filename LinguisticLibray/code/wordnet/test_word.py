@@ -1,25 +1,77 @@
 # test_word.py
 
+# Usage:
+#   python test_word.py <word>                  pretty print one word's segments
+#   python test_word.py - [--timing]            one JSON object per line, words read from stdin
+#   python test_word.py --file words.txt [--timing]
+
+import argparse
 import json
 import sys
+import time
 import pprint
 import morphemes_lib as morphemes
 from datetime import datetime
 
-startTime = datetime.now()
+def segment_word_record(word):
+	"generate_final_results for the word, or its failed segments"
+	results = morphemes.discover_segments(word)
+	if morphemes.format_results(results, "") == word:
+		return morphemes.json_safe(morphemes.generate_final_results(results))
+	else:
+		return {
+			"word": word,
+			"segments": morphemes.format_results(results, "+"),
+			"failed": True
+		}
+
+def stream_words(lines, out, timing):
+	"segment one word per line, writing and flushing a JSON line for each"
+	for line in lines:
+		word = line.strip()
+		if word == "":
+			continue
+		start_time = time.perf_counter()
+		record = segment_word_record(word)
+		if timing:
+			record["elapsed_ms"] = round(1000 * (time.perf_counter() - start_time), 3)
+		out.write(json.dumps(record) + "\n")
+		out.flush()
+
+def print_word_segments(word):
+	startTime = datetime.now()
+
+	pp = pprint.PrettyPrinter()
+
+	results = morphemes.discover_segments(word)
 
-pp = pprint.PrettyPrinter()
+	if morphemes.format_results(results, "") == word:
+		final_results = morphemes.generate_final_results(results)
+		#print(final_results)
+		pp.pprint(final_results)
+	else:
+		print(morphemes.format_results(results, "+"), "failed")
 
-word = sys.argv[1]
+	timeElapsed=datetime.now()-startTime
+	print('script: time elapsed (hh:mm:ss.ms) {}'.format(timeElapsed))
 
-results = morphemes.discover_segments(word)
+def main():
+	parser = argparse.ArgumentParser(description="Segment words into prefix, root and suffix")
+	parser.add_argument("word", nargs="?", help="word to segment, or - to stream words from stdin")
+	parser.add_argument("--file", help="stream words from this file, one per line")
+	parser.add_argument("--timing", action="store_true", help="add elapsed_ms to each streamed result")
+	args = parser.parse_args()
 
-if morphemes.format_results(results, "") == word:
-	final_results = morphemes.generate_final_results(results)
-	#print(final_results)
-	pp.pprint(final_results)
-else:
-	print(morphemes.format_results(results, "+"), "failed")
+	if args.file is not None:
+		with open(args.file, "r", encoding="utf-8") as words_file:
+			stream_words(words_file, sys.stdout, args.timing)
+	elif args.word == "-":
+		stream_words(sys.stdin, sys.stdout, args.timing)
+	elif args.word is not None:
+		print_word_segments(args.word)
+	else:
+		parser.print_usage()
+		sys.exit(1)
 
-timeElapsed=datetime.now()-startTime 
-print('script: time elapsed (hh:mm:ss.ms) {}'.format(timeElapsed))
+if __name__ == "__main__":
+	main()
@@ -1,13 +1,26 @@
+import argparse
 import random
 import json
 import os
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
+import numpy as np
 import morphemes_lib as morphemes  # Import the morphemes_lib to get the data directory path
+from morpheme_table import EMPTY_ROW, MorphemeTable
+from morpheme_sampler import TripleSampler
+from morpheme_bulk import BulkSampler
+from word_sink import FORMATS, write_words
 
 
 class WordGenerator:
-    def __init__(self, morphemes_file: str = "morphemes_enhanced.json"):
-        """Initialize the word generator with a morphemes database."""
+    def __init__(self, morphemes_file: str = "morphemes_enhanced.json", seed: Optional[int] = None):
+        """Initialize the word generator with a morphemes database.
+
+        With a seed, words come from a private random.Random and are reproducible;
+        without one they come from the global random module.
+        """
+        self.rng = random.Random(seed) if seed is not None else random
+        # generate_bulk's default NumPy generator, seeded from the same seed
+        self.np_rng = np.random.default_rng(seed)
         # Use the data directory path from morphemes_lib
         morphemes_filepath = os.path.join(morphemes.data_directory_path, morphemes_file)
 
@@ -24,74 +37,64 @@ class WordGenerator:
                 self.morphemes = json.loads(f.read())
             self.morphemes = json.loads(f.read())
 
-        # Separate morphemes by location
-        self.prefixes = []
-        self.roots = []
-        self.suffixes = []
+        # Columnar copy of the forms, with the syllable counts and boundary features the checks read
+        self.table = MorphemeTable.from_morphemes(self.morphemes)
 
-        for key, entry in self.morphemes.items():
+        # form -> syllables dict of the first entry listing it (None when the entry has none)
+        self.syllables_by_form = {}
+        for entry in self.morphemes.values():
             for form in entry["forms"]:
-                if form["loc"] == "prefix":
-                    self.prefixes.append({
-                        "form": form["form"],
-                        "meaning": entry["meaning"],
-                        "category": form.get("category", ""),
-                        "attach_to": form.get("attach_to", [])
-                    })
-                elif form["loc"] == "embedded":
-                    self.roots.append({
-                        "form": form["form"],
-                        "meaning": entry["meaning"]
-                    })
-                elif form["loc"] == "suffix":
-                    self.suffixes.append({
-                        "form": form["form"],
-                        "meaning": entry["meaning"]
-                    })
-
-    def is_valid_combination(self, prefix: str, root: str, suffix: str) -> bool:
-        """Check if the morpheme combination follows phonetic and syllabic rules."""
-        vowels = set('aeiou')
-
-        # Check if there's at least one vowel in the combination
-        combined = prefix + root + suffix
-        if not any(c in vowels for c in combined.lower()):
-            return False
-
-        # Get syllable counts for each component
-        def get_syllable_count(form: str) -> int:
-            for morph in self.morphemes.values():
-                if any(f["form"] == form for f in morph["forms"]):
-                    return morph.get("syllables", {}).get("count", 1)
-            return 1  # Default to 1 if not found
-
-        prefix_syllables = get_syllable_count(prefix) if prefix else 0
-        root_syllables = get_syllable_count(root) if root else 0
-        suffix_syllables = get_syllable_count(suffix) if suffix else 0
-
-        total_syllables = prefix_syllables + root_syllables + suffix_syllables
+                if form["form"] not in self.syllables_by_form:
+                    self.syllables_by_form[form["form"]] = entry.get("syllables")
 
-        # Most English words have between 1 and 4 syllables
-        if total_syllables > 4 or total_syllables < 1:
-            return False
+        # Separate morphemes by location, each list in step with its array of table rows
+        self.prefix_rows = self.table.rows(self.table.mask(loc="prefix"))
+        self.root_rows = self.table.rows(self.table.mask(loc="embedded"))
+        self.suffix_rows = self.table.rows(self.table.mask(loc="suffix"))
 
-        # Avoid triple consonants at morpheme boundaries
-        def is_consonant(c: str) -> bool:
-            return c.lower() not in vowels and c.isalpha()
-
-        if prefix and root:
-            if (is_consonant(prefix[-1]) and
-                    is_consonant(root[0]) and
-                    (len(root) > 1 and is_consonant(root[1]))):
-                return False
+        self.prefixes = []
+        for row in self.prefix_rows:
+            entry = self.morphemes[self.table.group_key(row)]
+            form = entry["forms"][self.table.form_ixs[row]]
+            self.prefixes.append({
+                "form": form["form"],
+                "meaning": entry["meaning"],
+                "category": form.get("category", ""),
+                "attach_to": form.get("attach_to", [])
+            })
+        self.roots = []
+        for row in self.root_rows:
+            entry = self.morphemes[self.table.group_key(row)]
+            self.roots.append({
+                "form": entry["forms"][self.table.form_ixs[row]]["form"],
+                "meaning": entry["meaning"]
+            })
+        self.suffixes = []
+        for row in self.suffix_rows:
+            entry = self.morphemes[self.table.group_key(row)]
+            self.suffixes.append({
+                "form": entry["forms"][self.table.form_ixs[row]]["form"],
+                "meaning": entry["meaning"]
+            })
 
-        if root and suffix:
-            if (len(root) > 1 and is_consonant(root[-2]) and
-                    is_consonant(root[-1]) and
-                    is_consonant(suffix[0])):
-                return False
+        # (include_prefix, include_root, include_suffix) -> TripleSampler, built on first use
+        self.samplers = {}
+        self.bulk_samplers = {}
 
-        return True
+    def is_valid_combination(self, prefix: str, root: str, suffix: str) -> bool:
+        """Check if the morpheme combination follows phonetic and syllabic rules.
+
+        At least one vowel, 1 to 4 syllables in all and no three consonants
+        in a row across a morpheme boundary; see MorphemeTable.valid_triples.
+        """
+        forms = [prefix, root, suffix]
+        table = self.table
+        rows = [table.row_of_form(form) for form in forms]
+        if None in rows:
+            # Forms outside the database count as one syllable, as in get_syllable_count
+            table = MorphemeTable.from_forms(forms, [self.get_syllable_count(form) for form in forms])
+            rows = [table.row_of_form(form) for form in forms]
+        return bool(table.valid_triples(*rows))
 
     def generate_word(self,
                       include_prefix: bool = True,
@@ -99,64 +102,122 @@ class WordGenerator:
                       include_suffix: bool = True,
                       max_attempts: int = 50,
                       max_syllables: int = 3) -> Dict:
-        """Generate a new word by combining morphemes."""
-        for _ in range(max_attempts):
-            # Randomly select morphemes
-            prefix = random.choice(self.prefixes) if include_prefix else {"form": "", "meaning": []}
-            root = random.choice(self.roots) if include_root else {"form": "", "meaning": []}
-            suffix = random.choice(self.suffixes) if include_suffix else {"form": "", "meaning": []}
-
-            # Check if the combination is valid
-            if self.is_valid_combination(prefix["form"], root["form"], suffix["form"]):
-                word = prefix["form"] + root["form"] + suffix["form"]
-                # Get syllable information
-                syllable_info = self.get_combined_syllables(prefix["form"], root["form"], suffix["form"])
-
-                return {
-                    "word": word,
-                    "segments": f"{prefix['form']}+{root['form']}+{suffix['form']}" if include_root else f"{prefix['form']}+{suffix['form']}",
-                    "syllables": syllable_info,
-                    "prefix": {
-                        "form": prefix["form"],
-                        "meaning": prefix["meaning"]
-                    } if include_prefix else None,
-                    "root": {
-                        "form": root["form"],
-                        "meaning": root["meaning"]
-                    } if include_root else None,
-                    "suffix": {
-                        "form": suffix["form"],
-                        "meaning": suffix["meaning"]
-                    } if include_suffix else None
-                }
-
-        raise ValueError("Could not generate a valid word within the maximum attempts")
+        """Generate a new word by combining morphemes.
 
-    def generate_multiple(self, count: int = 5) -> List[Dict]:
-        """Generate multiple words."""
-        words = []
-        for _ in range(count):
+        Draws straight from the combinations is_valid_combination accepts, so
+        max_attempts is no longer needed; ValueError means none exist.
+        """
+        # Randomly select a valid combination of morphemes
+        sampler = self.get_sampler(include_prefix, include_root, include_suffix)
+        prefix, root, suffix = sampler.sample(self.rng)
+
+        word = prefix["form"] + root["form"] + suffix["form"]
+        # Get syllable information
+        syllable_info = self.get_combined_syllables(prefix["form"], root["form"], suffix["form"])
+
+        return {
+            "word": word,
+            "segments": f"{prefix['form']}+{root['form']}+{suffix['form']}" if include_root else f"{prefix['form']}+{suffix['form']}",
+            "syllables": syllable_info,
+            "prefix": {
+                "form": prefix["form"],
+                "meaning": prefix["meaning"]
+            } if include_prefix else None,
+            "root": {
+                "form": root["form"],
+                "meaning": root["meaning"]
+            } if include_root else None,
+            "suffix": {
+                "form": suffix["form"],
+                "meaning": suffix["meaning"]
+            } if include_suffix else None
+        }
+
+    def get_slots(self, include_prefix: bool = True, include_root: bool = True,
+                  include_suffix: bool = True) -> Tuple[List[np.ndarray], List[List[Dict]]]:
+        """Table rows and morphemes of each slot, an empty form standing in for a left out slot."""
+        empty_rows = np.array([EMPTY_ROW])
+        empty = [{"form": "", "meaning": []}]
+        included = (include_prefix, include_root, include_suffix)
+        rows = [slot_rows if include else empty_rows
+                for slot_rows, include in zip((self.prefix_rows, self.root_rows, self.suffix_rows), included)]
+        slot_morphemes = [slot if include else empty
+                          for slot, include in zip((self.prefixes, self.roots, self.suffixes), included)]
+        return rows, slot_morphemes
+
+    def get_sampler(self, include_prefix: bool = True, include_root: bool = True,
+                    include_suffix: bool = True) -> TripleSampler:
+        """Sampler of valid combinations, laid out as get_slots."""
+        key = (include_prefix, include_root, include_suffix)
+        if key not in self.samplers:
+            rows, slot_morphemes = self.get_slots(include_prefix, include_root, include_suffix)
+            self.samplers[key] = TripleSampler(self.table, *rows, *slot_morphemes)
+        return self.samplers[key]
+
+    def get_bulk_sampler(self, include_prefix: bool = True, include_root: bool = True,
+                         include_suffix: bool = True) -> BulkSampler:
+        """Vectorized sampler of valid combinations, laid out like get_sampler's."""
+        key = (include_prefix, include_root, include_suffix)
+        if key not in self.bulk_samplers:
+            rows = self.get_slots(include_prefix, include_root, include_suffix)[0]
+            self.bulk_samplers[key] = BulkSampler(self.table, *rows)
+        return self.bulk_samplers[key]
+
+    def generate_bulk(self, count: int,
+                      rng: Optional[np.random.Generator] = None,
+                      include_prefix: bool = True,
+                      include_root: bool = True,
+                      include_suffix: bool = True) -> List[str]:
+        """Generate count words as plain strings, drawn and validated in NumPy batches.
+
+        For large runs where generate_word's per-word dicts cost too much; the
+        morphemes of a word can be recovered with get_bulk_sampler().sample_indices.
+        Without rng, draws from the generator's own NumPy stream, reproducible
+        when it was built with a seed.
+        """
+        sampler = self.get_bulk_sampler(include_prefix, include_root, include_suffix)
+        return sampler.words(sampler.sample_indices(count, rng if rng is not None else self.np_rng))
+
+    def iter_words(self, count: Optional[int] = None,
+                   include_prefix: bool = True,
+                   include_root: bool = True,
+                   include_suffix: bool = True) -> Iterator[Dict]:
+        """Yield generate_word results one at a time, count of them or forever when None.
+
+        Stops early if no valid combination exists.
+        """
+        generated = 0
+        while count is None or generated < count:
             try:
-                word = self.generate_word()
-                words.append(word)
+                yield self.generate_word(include_prefix, include_root, include_suffix)
             except ValueError:
-                continue
-        return words
+                return
+            generated += 1
+
+    def generate_multiple(self, count: int = 5) -> List[Dict]:
+        """Generate multiple words."""
+        return list(self.iter_words(count))
+
+    def get_syllable_count(self, form: str) -> int:
+        """Syllable count of the first morpheme listing the form, 1 if not found."""
+        row = self.table.row_of_form(form) if form else None
+        if row is not None:
+            return int(self.table.form_syllables[row])
+        return 1
+
+    def get_syllable_info(self, form: str) -> Dict:
+        """Syllables dict of the first morpheme listing the form, one syllable if not found."""
+        syllables = self.syllables_by_form.get(form)
+        if syllables is not None:
+            return syllables
+        return {"count": 1, "components": [{"syllable": form, "position": [0, len(form)]}]}
 
     def get_combined_syllables(self, prefix: str, root: str, suffix: str) -> Dict:
         """Get syllable information for the combined word."""
-
-        def get_syllable_info(form: str) -> Dict:
-            for morph in self.morphemes.values():
-                if any(f["form"] == form for f in morph["forms"]):
-                    return morph.get("syllables",
-                                     {"count": 1, "components": [{"syllable": form, "position": [0, len(form)]}]})
-            return {"count": 1, "components": [{"syllable": form, "position": [0, len(form)]}]}
-
         # Get syllable info for each component
-        prefix_info = get_syllable_info(prefix) if prefix else {"count": 0, "components": []}
-        root_info = get_syllable_info(root) if root else {"count": 0, "components": []}
-        suffix_info = get_syllable_info(suffix) if suffix else {"count": 0, "components": []}
+        prefix_info = self.get_syllable_info(prefix) if prefix else {"count": 0, "components": []}
+        root_info = self.get_syllable_info(root) if root else {"count": 0, "components": []}
+        suffix_info = self.get_syllable_info(suffix) if suffix else {"count": 0, "components": []}
 
         # Combine syllable counts
         total_count = prefix_info["count"] + root_info["count"] + suffix_info["count"]
@@ -247,17 +308,17 @@ class WordGenerator:
         for _ in range(50):
             try:
                 # Use either a themed prefix or root (or both if available)
-                if themed_morphemes["prefixes"] and themed_morphemes["roots"] and random.random() < 0.5:
-                    prefix = random.choice(themed_morphemes["prefixes"])
-                    root = random.choice(themed_morphemes["roots"])
+                if themed_morphemes["prefixes"] and themed_morphemes["roots"] and self.rng.random() < 0.5:
+                    prefix = self.rng.choice(themed_morphemes["prefixes"])
+                    root = self.rng.choice(themed_morphemes["roots"])
                 elif themed_morphemes["prefixes"]:
-                    prefix = random.choice(themed_morphemes["prefixes"])
-                    root = random.choice(self.roots)
+                    prefix = self.rng.choice(themed_morphemes["prefixes"])
+                    root = self.rng.choice(self.roots)
                 else:
-                    prefix = random.choice(self.prefixes)
-                    root = random.choice(themed_morphemes["roots"])
+                    prefix = self.rng.choice(self.prefixes)
+                    root = self.rng.choice(themed_morphemes["roots"])
 
-                suffix = random.choice(self.suffixes)  # Allow any suffix
+                suffix = self.rng.choice(self.suffixes)  # Allow any suffix
 
                 if self.is_valid_combination(prefix["form"], root["form"], suffix["form"]):
                     word = prefix["form"] + root["form"] + suffix["form"]
@@ -280,9 +341,22 @@ class WordGenerator:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate words from morphemes")
+    parser.add_argument("--output", help="write words to this JSONL or CSV file instead of printing samples")
+    parser.add_argument("--format", choices=FORMATS, help="output format, from the file extension by default")
+    parser.add_argument("--count", type=int, default=1000, help="words to write with --output")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="words buffered between writes")
+    args = parser.parse_args()
+
     # Initialize the word generator
     generator = WordGenerator()
 
+    if args.output:
+        written = write_words(generator.iter_words(), args.output, args.format,
+                              limit=args.count, chunk_size=args.chunk_size)
+        print(f"Wrote {written} words to {args.output}")
+        return
+
     print("Generating 5 random words:")
     words = generator.generate_multiple(5)
     for word in words:
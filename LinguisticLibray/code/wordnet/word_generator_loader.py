@@ -0,0 +1,25 @@
+"""
+word_generator_loader.py - Import word-generator.py as a module
+
+word-generator.py is not an importable module name, so scripts that need
+WordGenerator load it from its file path through load_word_generator.
+"""
+
+import importlib.util
+import os
+
+word_generator_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "word-generator.py")
+
+# The loaded module, shared by every caller in the process
+word_generator = None
+
+
+def load_word_generator():
+    """The word-generator.py module, executed on the first call."""
+    global word_generator
+    if word_generator is None:
+        spec = importlib.util.spec_from_file_location("word_generator", word_generator_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        word_generator = module
+    return word_generator
@@ -0,0 +1,119 @@
+"""
+word_sink.py - Write generated words to JSONL or CSV in chunks
+
+Words are buffered and written chunk_size at a time, so memory stays constant
+however many words pass through. write_words consumes a lazy iterator such as
+WordGenerator.iter_words and stops pulling from it once limit words have been
+accepted, so nothing more is generated than is written.
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterable, Optional, Union
+
+CSV_COLUMNS = ["word", "segments", "syllables", "syllable_breakdown",
+               "prefix", "prefix_meaning", "root", "root_meaning", "suffix", "suffix_meaning"]
+
+FORMATS = ("jsonl", "csv")
+
+
+def format_from_path(path: str) -> str:
+    """"csv" for a .csv path, "jsonl" otherwise."""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def csv_row(word: Dict) -> Dict:
+    """Flat CSV row of a WordGenerator or SyllableWordGenerator generate_word result."""
+    # SyllableWordGenerator nests the morphemes under components
+    parts = word.get("components", word)
+    row = {"word": word["word"]}
+    for part in ("prefix", "root", "suffix"):
+        if parts.get(part):
+            row[part] = parts[part]["form"]
+            row[part + "_meaning"] = "; ".join(parts[part]["meaning"])
+    if "segments" in word:
+        row["segments"] = word["segments"]
+    elif "components" in word:
+        row["segments"] = "+".join(parts[part]["form"] for part in ("prefix", "root", "suffix") if parts.get(part))
+    syllables = word.get("syllables")
+    if syllables:
+        row["syllables"] = syllables["count"]
+        row["syllable_breakdown"] = "-".join(comp["syllable"] for comp in syllables["components"])
+    elif word.get("syllable_breakdown"):
+        row["syllables"] = len(word["syllable_breakdown"])
+        row["syllable_breakdown"] = "-".join(word["syllable_breakdown"])
+    return row
+
+
+class WordSink:
+    """Buffered writer of generated words, usable as a context manager.
+
+    Takes generate_word result dicts, or plain strings such as generate_bulk
+    returns, which are written as {"word": ...}.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, chunk_size: int = 1000):
+        self.fmt = fmt or format_from_path(path)
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown format: {self.fmt}")
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.buffer = io.StringIO()
+        self.buffered = 0
+        if self.fmt == "csv":
+            self.csv_writer = csv.DictWriter(self.buffer, fieldnames=CSV_COLUMNS, restval="")
+            self.csv_writer.writeheader()
+
+    def write(self, word: Union[Dict, str]):
+        if isinstance(word, str):
+            word = {"word": word}
+        if self.fmt == "csv":
+            self.csv_writer.writerow(csv_row(word))
+        else:
+            self.buffer.write(json.dumps(word, ensure_ascii=False))
+            self.buffer.write("\n")
+        self.count += 1
+        self.buffered += 1
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered words out to the file."""
+        self.file.write(self.buffer.getvalue())
+        self.file.flush()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffered = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self) -> 'WordSink':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_words(words: Iterable[Union[Dict, str]], path: str, fmt: Optional[str] = None,
+                limit: Optional[int] = None, accept: Optional[Callable] = None,
+                chunk_size: int = 1000) -> int:
+    """Write words to path until the iterable ends or limit words were accepted.
+
+    accept, when given, filters the words; the rest are not written and do not
+    count toward limit. Returns the number of words written.
+    """
+    with WordSink(path, fmt, chunk_size) as sink:
+        if limit is not None and limit <= 0:
+            return 0
+        for word in words:
+            if accept is not None and not accept(word):
+                continue
+            sink.write(word)
+            if limit is not None and sink.count >= limit:
+                break
+        return sink.count